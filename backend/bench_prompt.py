@@ -0,0 +1,155 @@
+"""
+Benchmark: pretty-printed JSON vs. compact tabular plan encoding in the
+/api/recommend prompt — prompt and reply size, plus a modelled latency
+estimate.
+
+No network and no real replies: each format gets a synthetic reply of the
+shape the prompt asks for (same ranking and prose), built by
+_synthetic_reply. The latency column is an estimate, not a measurement:
+the measured local work (build prompt, parse + decode reply) plus a model
+time computed from the token counts with rough Flash-Lite constants
+(OVERHEAD_MS + PREFILL_MS_PER_TOKEN per input token + DECODE_MS_PER_TOKEN
+per output token). It shows how the token savings would translate, not
+what Gemini actually does. Run from backend/:
+
+    python bench_prompt.py
+"""
+import json
+import random
+import statistics
+import time
+
+from gemini_analyzer import _build_prompt, _decode_recommendation, _parse_json
+from prompt_codec import estimate_tokens
+from scraper.seed_data import SEED_PLANS
+
+# Latency model for the estimate (rough Flash-Lite figures, not measured)
+OVERHEAD_MS = 350.0
+PREFILL_MS_PER_TOKEN = 0.02
+DECODE_MS_PER_TOKEN = 3.0
+REPEATS = 50
+
+USER = {"age": 30, "sum_assured": 100, "premium_budget": 12000, "policy_term": 30, "min_csr": 97.0}
+
+
+def _legacy_prompt(user, plans) -> str:
+    """The previous prompt: json.dumps(indent=2) plan list, names echoed back in the reply."""
+    plan_summaries = [
+        {
+            "plan_name": p["plan_name"],
+            "provider": p["provider"],
+            "premium_annual": p["premium_annual"],
+            "sum_assured_min_lakhs": p["sum_assured_min"],
+            "sum_assured_max_lakhs": p["sum_assured_max"],
+            "policy_term_min": p["policy_term_min"],
+            "policy_term_max": p["policy_term_max"],
+            "claim_settlement_ratio": p["claim_settlement_ratio"],
+            "key_features": p.get("key_features", "").split("|"),
+        }
+        for p in plans
+    ]
+    plans_text = json.dumps(plan_summaries, indent=2)
+    return f"""
+You are an expert Indian term insurance advisor. Analyze the following term insurance plans and recommend the best ones for the user described below.
+
+USER PROFILE:
+- Age: {user['age']} years
+- Desired Sum Assured: ₹{user['sum_assured']} Lakhs
+- Maximum Annual Premium Budget: ₹{user['premium_budget']}
+- Desired Policy Term: {user['policy_term']} years
+- Minimum Claim Settlement Ratio preferred: {user['min_csr']}%
+
+AVAILABLE PLANS (filtered for this user's age):
+{plans_text}
+
+INSTRUCTIONS:
+1. Rank ALL plans from best to worst for this specific user.
+2. For each plan provide: rank, plan_name, provider, reason (2-3 sentences explaining why it suits or doesn't suit the user), score (0-100), and a pros/cons list.
+3. Give an overall_summary paragraph (3-4 sentences) explaining the top recommendation clearly.
+4. Consider: claim settlement ratio, premium affordability, policy term match, sum assured coverage, and key features.
+5. If a plan's premium exceeds the budget, flag it clearly.
+
+Respond ONLY with valid JSON in this exact format:
+{{
+  "overall_summary": "...",
+  "top_pick": "Plan Name by Provider",
+  "ranked_plans": [
+    {{
+      "rank": 1,
+      "plan_name": "...",
+      "provider": "...",
+      "score": 92,
+      "reason": "...",
+      "pros": ["...", "..."],
+      "cons": ["...", "..."],
+      "within_budget": true,
+      "claim_settlement_ratio": 99.5
+    }}
+  ]
+}}
+"""
+
+
+def _synthetic_reply(plans, compact: bool) -> str:
+    """A synthetic reply of the shape each format asks the model for (same ranking and prose)."""
+    entries = []
+    for i, p in enumerate(plans, 1):
+        body = {
+            "score": 95 - i,
+            "reason": (f"Claim settlement ratio of {p['claim_settlement_ratio']}% with a premium of "
+                       f"₹{p['premium_annual']} a year. It covers the requested term and sum assured."),
+            "pros": p["key_features"].split("|")[:2],
+            "cons": ["Premium close to budget"],
+        }
+        if compact:
+            entries.append({"id": i, **body})
+        else:
+            entries.append({"rank": i, "plan_name": p["plan_name"], "provider": p["provider"], **body,
+                            "within_budget": p["premium_annual"] <= USER["premium_budget"],
+                            "claim_settlement_ratio": p["claim_settlement_ratio"]})
+    top = 1 if compact else f"{plans[0]['plan_name']} by {plans[0]['provider']}"
+    summary = "The top plan balances a high claim settlement ratio with an affordable premium for this profile."
+    return json.dumps({"overall_summary": summary, "top_pick": top, "ranked_plans": entries}, indent=2)
+
+
+def _catalog(n: int):
+    """The seed plans, padded with renamed copies up to n."""
+    rnd = random.Random(3)
+    plans = [dict(p) for p in SEED_PLANS]
+    while len(plans) < n:
+        p = dict(rnd.choice(SEED_PLANS))
+        p["plan_name"] = f"{p['plan_name']} {len(plans)}"
+        plans.append(p)
+    return plans[:n]
+
+
+def _run(plans, compact: bool):
+    reply = _synthetic_reply(plans, compact)
+    local_ms = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        prompt = _build_prompt(USER, plans) if compact else _legacy_prompt(USER, plans)
+        parsed = _parse_json(reply)
+        if compact:
+            _decode_recommendation(parsed, USER, plans)
+        local_ms.append((time.perf_counter() - started) * 1000)
+    tokens_in, tokens_out = estimate_tokens(prompt), estimate_tokens(reply)
+    model_ms = OVERHEAD_MS + tokens_in * PREFILL_MS_PER_TOKEN + tokens_out * DECODE_MS_PER_TOKEN
+    return len(prompt), tokens_in, tokens_out, statistics.median(local_ms) + model_ms
+
+
+def main():
+    print(f"Synthetic replies; est. latency = local work + modelled {OVERHEAD_MS:.0f}ms "
+          f"+ {PREFILL_MS_PER_TOKEN}ms/input token + {DECODE_MS_PER_TOKEN}ms/output token\n")
+    print(f"{'plans':>5} {'format':<8} {'chars':>8} {'in tok':>8} {'out tok':>8} {'est. latency':>13}")
+    for n in (10, len(SEED_PLANS), 100):
+        plans = _catalog(n)
+        rows = {label: _run(plans, compact) for label, compact in (("json", False), ("compact", True))}
+        for label, (chars, tin, tout, ms) in rows.items():
+            print(f"{n:>5} {label:<8} {chars:>8,} {tin:>8,} {tout:>8,} {ms:>11.0f}ms")
+        (_, jin, jout, jms), (_, cin, cout, cms) = rows["json"], rows["compact"]
+        print(f"{'':>5} {'saved':<8} {'':>8} {1 - cin / jin:>8.0%} {1 - cout / jout:>8.0%} {1 - cms / jms:>12.0%}\n")
+
+
+if __name__ == "__main__":
+    main()
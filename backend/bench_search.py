@@ -0,0 +1,96 @@
+"""
+Benchmark: ILIKE '%term%' scan vs. the full-text index behind /api/plans?search=.
+Both sides search plan_name, provider and key_features and return ids best-first
+(CSR order for the scan, relevance for the index).
+
+Loads N synthetic plans (default 100,000) and times both query shapes for a few
+search terms. Uses a throwaway SQLite file unless BENCH_DATABASE_URL points at a
+Postgres database (the table is dropped and recreated there — use a scratch DB).
+Run from backend/:
+
+    python bench_search.py
+    BENCH_DATABASE_URL=postgresql://localhost/scratch python bench_search.py
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+if os.getenv("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_search_'), 'bench.db')}"
+
+from sqlalchemy import insert  # noqa: E402
+
+from database import Base, InsurancePlan, SessionLocal, engine, init_db, search_plan_ids  # noqa: E402
+
+PROVIDERS = ["HDFC Life", "ICICI Prudential", "Axis Max Life", "Tata AIA", "Bajaj Allianz", "SBI Life",
+             "LIC", "Kotak Life", "Aditya Birla", "Canara HSBC", "PNB MetLife", "Edelweiss Tokio"]
+NAME_WORDS = ["Click", "Protect", "Smart", "Secure", "Plus", "Term", "Shield", "Raksha", "Supreme",
+              "Digi", "Jeevan", "Elite", "Total", "Flexi", "Prime", "Saral", "Sampoorna", "Life"]
+FEATURES = ["Critical illness cover", "Accidental death benefit", "Waiver of premium", "Return of premium",
+            "Joint life cover", "Terminal illness benefit", "Whole life option", "Income benefit"]
+TERMS = ["hdfc", "smart sec", "raksha", "critical", "zzznomatch"]
+REPEATS = 20
+
+
+def _rows(n: int):
+    rnd = random.Random(42)
+    for i in range(n):
+        yield {
+            "plan_name": " ".join(rnd.sample(NAME_WORDS, 3)) + f" {i}",
+            "provider": rnd.choice(PROVIDERS),
+            "source": "bench",
+            "claim_settlement_ratio": round(rnd.uniform(90, 100), 2),
+            "key_features": "|".join(rnd.sample(FEATURES, 4)),
+        }
+
+
+def _median_ms(fn) -> float:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    rows = list(_rows(n))
+    with engine.begin() as conn:
+        for i in range(0, n, 5000):
+            conn.execute(insert(InsurancePlan), rows[i:i + 5000])
+
+    print(f"{n:,} plans on {engine.dialect.name}; median of {REPEATS} runs")
+    print(f"{'search':<12} {'ILIKE scan':>12} {'full-text':>12} {'hits':>8}")
+    db = SessionLocal()
+    try:
+        for term in TERMS:
+            like = f"%{term}%"
+
+            def scan():
+                return db.query(InsurancePlan.id).filter(
+                    InsurancePlan.plan_name.ilike(like)
+                    | InsurancePlan.provider.ilike(like)
+                    | InsurancePlan.key_features.ilike(like)
+                ).order_by(InsurancePlan.claim_settlement_ratio.desc()).all()
+
+            def fts():
+                return search_plan_ids(db, term)
+
+            if fts() is None:
+                print("Full-text index unavailable on this database")
+                return
+            print(f"{term:<12} {_median_ms(scan):>10.2f}ms {_median_ms(fts):>10.2f}ms {len(fts()):>8,}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
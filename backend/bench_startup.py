@@ -0,0 +1,78 @@
+"""
+Benchmark: import cost of the API module (`import main`), from `python -X importtime`.
+
+Reports the median total import time over a few fresh interpreters plus the
+heaviest modules imported directly. Pass a git revision to measure it side by side
+(checked out into a temporary worktree). Run from backend/:
+
+    python bench_startup.py
+    python bench_startup.py --compare HEAD~1
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+RUNS = 5
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _measure(backend_dir: str):
+    """(median total µs, {module imported by main: median cumulative µs})."""
+    totals, per_package = [], defaultdict(list)
+    env = {**os.environ, "DATABASE_URL": "sqlite:///:memory:", "PYTHONDONTWRITEBYTECODE": "1"}
+    for _ in range(RUNS):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=backend_dir, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"import main failed in {backend_dir}:\n{proc.stderr[-2000:]}")
+        total = 0
+        for m in _LINE.finditer(proc.stderr):
+            self_us, cumulative_us, indent, name = int(m[1]), int(m[2]), m[3], m[4]
+            total += self_us
+            if len(indent) in (1, 3) and name != "main":   # main's direct imports
+                per_package[name].append(cumulative_us)
+        totals.append(total)
+    packages = {name: statistics.median(v) for name, v in per_package.items()}
+    return statistics.median(totals), packages
+
+
+def _report(label: str, total: float, packages: dict, top: int = 8):
+    print(f"{label}: import main = {total / 1000:.0f} ms (median of {RUNS})")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"    {name:<28} {us / 1000:>8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--compare", metavar="REV", help="git revision to measure as the baseline")
+    args = parser.parse_args()
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    if args.compare:
+        repo = subprocess.check_output(["git", "rev-parse", "--show-toplevel"], cwd=here, text=True).strip()
+        with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+            worktree = os.path.join(tmp, "baseline")
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.compare],
+                           cwd=repo, check=True, capture_output=True)
+            try:
+                base_total, base_pkgs = _measure(os.path.join(worktree, os.path.relpath(here, repo)))
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=repo, capture_output=True)
+        _report(f"before ({args.compare})", base_total, base_pkgs)
+
+    total, packages = _measure(here)
+    _report("after (working tree)" if args.compare else "working tree", total, packages)
+    if args.compare:
+        print(f"\nimport time: {base_total / 1000:.0f} ms -> {total / 1000:.0f} ms "
+              f"({(1 - total / base_total) * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: legacy per-row upsert vs. bulk set-based _upsert_plans.
+
+Upserts N synthetic plans into a throwaway SQLite file twice per path:
+once into an empty table (all inserts) and once more with changed premiums
+(all updates). Run from backend/:
+
+    python bench_upsert.py            # 10,000 plans
+    python bench_upsert.py 50000
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+_tmpdir = tempfile.mkdtemp(prefix="bench_upsert_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}"
+
+from database import SessionLocal, InsurancePlan, init_db, engine  # noqa: E402
+from scraper.scheduler import _upsert_plans  # noqa: E402
+
+
+def _legacy_upsert(plans: list, db):
+    """The original per-row implementation (one SELECT per plan)."""
+    for p in plans:
+        existing = (
+            db.query(InsurancePlan)
+            .filter(
+                InsurancePlan.plan_name == p["plan_name"],
+                InsurancePlan.provider == p["provider"],
+            )
+            .first()
+        )
+        if existing:
+            for k, v in p.items():
+                setattr(existing, k, v)
+            existing.scraped_at = datetime.utcnow()
+        else:
+            db.add(InsurancePlan(**p))
+    db.commit()
+
+
+def _synthetic_plans(n: int, premium_offset: int = 0) -> list:
+    return [
+        {
+            "plan_name": f"Bench Plan {i}",
+            "provider": f"Provider {i % 40}",
+            "source": "bench",
+            "sum_assured_min": 25,
+            "sum_assured_max": 10000,
+            "premium_annual": 8000 + (i % 500) + premium_offset,
+            "policy_term_min": 10,
+            "policy_term_max": 40,
+            "age_min": 18,
+            "age_max": 65,
+            "claim_settlement_ratio": 95 + (i % 50) / 10,
+            "key_features": "Feature A|Feature B|Feature C",
+            "source_url": "https://example.com",
+        }
+        for i in range(n)
+    ]
+
+
+def _time(fn, plans) -> float:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        fn(plans, db)
+        return time.perf_counter() - started
+    finally:
+        db.close()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    init_db()
+    fresh, changed = _synthetic_plans(n), _synthetic_plans(n, premium_offset=100)
+
+    results = {}
+    for label, fn in (("legacy per-row", _legacy_upsert), ("bulk", _upsert_plans)):
+        with engine.begin() as conn:
+            conn.execute(InsurancePlan.__table__.delete())
+        results[label] = (_time(fn, fresh), _time(fn, changed))
+
+    print(f"Upserting {n:,} plans (SQLite, {engine.url.database})")
+    print(f"{'path':<16} {'insert':>10} {'update':>10}")
+    for label, (ins, upd) in results.items():
+        print(f"{label:<16} {ins:>9.2f}s {upd:>9.2f}s")
+    (li, lu), (bi, bu) = results["legacy per-row"], results["bulk"]
+    print(f"{'speed-up':<16} {li / bi:>9.1f}x {lu / bu:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+EXPLAIN-based check that every query the API still sends to the database is
+served by an index from the managed set in database.py.
+
+Builds a throwaway SQLite database (or uses BENCH_DATABASE_URL — a scratch
+Postgres DB), fills it with a few thousand plans, runs ANALYZE and inspects
+the query plan of each query shape. Exits non-zero if any plan falls back to
+a full table scan or a temp sort for ORDER BY. Run from backend/:
+
+    python check_indexes.py
+"""
+import os
+import random
+import sys
+import tempfile
+
+if os.getenv("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='check_idx_'), 'check.db')}"
+
+from sqlalchemy import func, insert, select, text  # noqa: E402
+
+from database import Base, InsurancePlan, PlanChange, SessionLocal, engine, init_db, search_clause  # noqa: E402
+from main import _plan_page_query  # noqa: E402
+from scraper.scheduler import _existing_rows_query  # noqa: E402
+
+SOURCES = ["policyx", "coverfox", "coverfox_csr", "maxlife", "hdfclife", "bankbazaar", "seed", "manual"]
+
+
+def _populate(n: int = 5000):
+    rnd = random.Random(7)
+    rows = [
+        {
+            "plan_name": f"Plan {i}",
+            "provider": f"Provider {i % 60}",
+            "source": rnd.choice(SOURCES),
+            "claim_settlement_ratio": round(rnd.uniform(90, 100), 2),
+            "age_min": rnd.choice([18, 21, 25, 30]),
+            "age_max": rnd.choice([45, 55, 60, 65]),
+            "policy_term_min": rnd.choice([5, 10, 15]),
+            "policy_term_max": rnd.choice([30, 40, 50]),
+            "key_features": "Critical illness|Waiver of premium",
+        }
+        for i in range(n)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(InsurancePlan), rows)
+        conn.execute(insert(PlanChange), [
+            {"plan_id": i + 1, "field": "premium_annual", "old_value": "1", "new_value": "2", "source": "seed"}
+            for i in range(0, n, 10)
+        ])
+        conn.execute(text("ANALYZE"))
+
+
+def _query_shapes(db):
+    """(label, statement, must_avoid_temp_sort) for every DB-backed query the API issues."""
+    def page(**kw):
+        return _plan_page_query(db, kw.get("source"), kw.get("min_csr"), kw.get("search"), kw.get("after")).statement
+
+    return [
+        ("GET /api/plans/stream — first page", page(), True),
+        ("GET /api/plans/stream — keyset page", page(after=(97.5, 1200)), True),
+        ("GET /api/plans/stream?source=", page(source="maxlife"), True),
+        ("GET /api/plans/stream?source= — keyset page", page(source="maxlife", after=(97.5, 1200)), True),
+        ("GET /api/plans/stream?min_csr=", page(min_csr=99.5), True),
+        ("GET /api/plans?search= (full-text)", select(InsurancePlan.id).where(search_clause("critical")), False),
+        ("scrape upsert — existing (plan_name, provider) keys",
+         _existing_rows_query([("Plan 1", "Provider 1"), ("Plan 2", "Provider 2")]), False),
+        ("PUT/DELETE /api/plans/{id}", select(InsurancePlan).where(InsurancePlan.id == 42), False),
+        ("stats — plans per source",
+         select(InsurancePlan.source, func.count(InsurancePlan.id)).group_by(InsurancePlan.source), True),
+        ("eligibility — age / term range",
+         select(InsurancePlan.id).where(InsurancePlan.age_min <= 20, InsurancePlan.policy_term_min <= 5), False),
+        ("plan change history", select(PlanChange).where(PlanChange.plan_id == 42), False),
+    ]
+
+
+def _explain(conn, stmt) -> list:
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    if engine.dialect.name == "sqlite":
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    conn.execute(text("SET enable_seqscan = off"))    # tiny tables would otherwise always seq-scan
+    return [row[0] for row in conn.execute(text(f"EXPLAIN {sql}"))]
+
+
+def _uses_index(plan: list) -> bool:
+    if engine.dialect.name == "sqlite":
+        # "SCAN n CONSTANT ROWS" is the literal IN (VALUES …) list, not a table
+        scans = [line for line in plan if line.startswith(("SCAN", "SEARCH")) and "CONSTANT ROWS" not in line]
+        return bool(scans) and all(
+            "USING" in line or "VIRTUAL TABLE INDEX" in line for line in scans
+        )
+    return any("Index" in line for line in plan) and not any("Seq Scan" in line for line in plan)
+
+
+def main() -> int:
+    if engine.dialect.name != "sqlite":
+        Base.metadata.drop_all(bind=engine)
+    init_db()
+    _populate()
+    failures = 0
+    db = SessionLocal()
+    try:
+        with engine.connect() as conn:
+            for label, stmt, no_temp_sort in _query_shapes(db):
+                plan = _explain(conn, stmt)
+                ok = _uses_index(plan)
+                if no_temp_sort and engine.dialect.name == "sqlite":
+                    ok = ok and not any("TEMP B-TREE" in line for line in plan)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {label}")
+                for line in plan:
+                    print(f"       {line}")
+    finally:
+        db.close()
+    print(f"\n{failures} query shape(s) not served by an index" if failures else "\nAll query shapes use an index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,30 @@
+import logging
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
-from sqlalchemy.orm import declarative_base, sessionmaker
+import re
+from typing import List, Optional
+from sqlalchemy import create_engine, column, desc, event, inspect, insert, select, text, update, Column, Integer, String, Float, DateTime, Index, ForeignKey
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import declarative_base, relationship, sessionmaker, Session
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./insurance.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        # SQLite ignores FOREIGN KEY clauses (and ON DELETE CASCADE) unless enabled per connection
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -29,9 +48,242 @@ class InsurancePlan(Base):
     source_url = Column(String, default="")
     scraped_at = Column(DateTime, default=datetime.utcnow)
 
+    # Age → annual premium points, where a source publishes more than the age-30 quote
+    premium_curve = relationship(
+        "PlanPremiumCurve", order_by="PlanPremiumCurve.age", cascade="all, delete-orphan",
+    )
+
+    # Managed index set — one per access path. init_db() adds any that an existing
+    # database is missing, so new entries here migrate old insurance.db files too.
+    __table_args__ = (
+        # Natural key used by the scraper upsert (ON CONFLICT target) and manual CRUD
+        Index("uq_insurance_plans_plan_name_provider", "plan_name", "provider", unique=True),
+        # Plan listing / streaming: ORDER BY claim_settlement_ratio DESC, id (keyset pages)
+        Index("ix_insurance_plans_csr_id", desc("claim_settlement_ratio"), "id"),
+        # ?source= filter in listing order (keyset pages), and GROUP BY source for stats
+        Index("ix_insurance_plans_source_csr", "source", desc("claim_settlement_ratio"), "id"),
+        # Eligibility range filters on entry age and policy term
+        Index("ix_insurance_plans_age_range", "age_min", "age_max"),
+        Index("ix_insurance_plans_term_range", "policy_term_min", "policy_term_max"),
+    )
+
+
+class PlanPremiumCurve(Base):
+    """One point of a plan's scraped age → annual premium curve (same cover as premium_annual)."""
+    __tablename__ = "plan_premium_curves"
+
+    plan_id = Column(Integer, ForeignKey("insurance_plans.id", ondelete="CASCADE"), primary_key=True)
+    age = Column(Integer, primary_key=True)
+    premium = Column(Float, nullable=False)           # annual premium in INR at this entry age
+
+    __table_args__ = {"sqlite_with_rowid": False}     # clustered on (plan_id, age)
+
+
+class PlanChange(Base):
+    """Field-level change recorded when a scrape actually alters a stored plan."""
+    __tablename__ = "plan_changes"
+
+    id = Column(Integer, primary_key=True)
+    plan_id = Column(Integer, ForeignKey("insurance_plans.id", ondelete="CASCADE"), nullable=False, index=True)
+    field = Column(String, nullable=False)
+    old_value = Column(String)
+    new_value = Column(String)
+    source = Column(String, nullable=False)           # scraper source that made the change
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CatalogVersion(Base):
+    """
+    Single-row counter of writes to the plan catalog. Every committed change to
+    insurance_plans (or its curves) bumps it, so each worker process can tell
+    whether its in-memory plan snapshot is still current.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+def catalog_version(conn) -> int:
+    """The stored catalog version (`conn`: a Session or Connection)."""
+    return conn.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar() or 0
+
+
+def bump_catalog_version(conn) -> int:
+    """Increment the catalog version inside `conn`'s transaction; returns the new value."""
+    conn.execute(update(CatalogVersion).where(CatalogVersion.id == 1).values(version=CatalogVersion.version + 1))
+    return catalog_version(conn)
+
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _ensure_catalog_version()
+    _purge_orphans()
+    _migrate_indexes()
+    _ensure_search_index()
+
+
+def _ensure_catalog_version():
+    """Create the catalog_version row (another worker starting at the same time may win the race)."""
+    try:
+        with engine.begin() as conn:
+            if conn.execute(select(CatalogVersion.id).where(CatalogVersion.id == 1)).first() is None:
+                conn.execute(insert(CatalogVersion).values(id=1, version=0))
+    except IntegrityError:
+        pass
+
+
+def _purge_orphans():
+    """
+    Drop plan_changes / plan_premium_curves rows whose plan no longer exists, left
+    behind by deletes made before SQLite foreign keys were enforced (plan ids can
+    be reused, so they would otherwise attach to a later plan).
+    """
+    with engine.begin() as conn:
+        for table in (PlanChange.__table__, PlanPremiumCurve.__table__):
+            purged = conn.execute(
+                table.delete().where(table.c.plan_id.not_in(select(InsurancePlan.id)))
+            ).rowcount
+            if purged:
+                logger.info(f"Removed {purged} orphaned {table.name} rows")
+
+
+def _migrate_indexes():
+    """
+    Create every declared index that an existing database is missing
+    (create_all() only builds indexes for tables it creates itself).
+    Before adding the unique (plan_name, provider) index, duplicate plans are
+    collapsed, keeping the oldest row (the one the old per-row upsert kept updating).
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        missing = [i for i in table.indexes if i.name not in existing]
+        for index in missing:
+            with engine.begin() as conn:
+                if table is InsurancePlan.__table__ and index.unique:
+                    conn.execute(text(
+                        "DELETE FROM insurance_plans WHERE id NOT IN "
+                        "(SELECT MIN(id) FROM insurance_plans GROUP BY plan_name, provider)"
+                    ))
+                    bump_catalog_version(conn)
+                index.create(bind=conn)
+            logger.info(f"Created missing index {index.name}")
+
+
+# ── Full-text search over plan_name, provider and key_features ───────────────
+#
+# SQLite: an external-content FTS5 table kept in sync by triggers, so bulk upserts,
+# ON CONFLICT updates and the CRUD endpoints all update it without extra code.
+# Postgres: a GIN index on a weighted tsvector expression (maintained by Postgres).
+
+_SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS insurance_plans_fts USING fts5(
+        plan_name, provider, key_features,
+        content='insurance_plans', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS insurance_plans_fts_ai AFTER INSERT ON insurance_plans BEGIN
+        INSERT INTO insurance_plans_fts(rowid, plan_name, provider, key_features)
+        VALUES (new.id, new.plan_name, new.provider, new.key_features);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS insurance_plans_fts_ad AFTER DELETE ON insurance_plans BEGIN
+        INSERT INTO insurance_plans_fts(insurance_plans_fts, rowid, plan_name, provider, key_features)
+        VALUES ('delete', old.id, old.plan_name, old.provider, old.key_features);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS insurance_plans_fts_au
+    AFTER UPDATE OF plan_name, provider, key_features ON insurance_plans BEGIN
+        INSERT INTO insurance_plans_fts(insurance_plans_fts, rowid, plan_name, provider, key_features)
+        VALUES ('delete', old.id, old.plan_name, old.provider, old.key_features);
+        INSERT INTO insurance_plans_fts(rowid, plan_name, provider, key_features)
+        VALUES (new.id, new.plan_name, new.provider, new.key_features);
+    END""",
+]
+
+# Name matches rank above provider matches, which rank above feature matches
+_PG_TSVECTOR = (
+    "setweight(to_tsvector('simple', coalesce(plan_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(provider, '')), 'B') || "
+    "setweight(to_tsvector('simple', replace(coalesce(key_features, ''), '|', ' ')), 'C')"
+)
+_SQLITE_BM25 = "bm25(insurance_plans_fts, 10.0, 5.0, 1.0)"
+
+_search_backend: Optional[str] = None      # "fts5" | "postgres" | None (substring fallback)
+
+
+def _ensure_search_index():
+    """Create the full-text index for the current dialect; leave search on substring matching if unsupported."""
+    global _search_backend
+    dialect = engine.dialect.name
+    try:
+        if dialect == "sqlite":
+            with engine.begin() as conn:
+                existed = inspect(conn).has_table("insurance_plans_fts")
+                for ddl in _SQLITE_FTS_DDL:
+                    conn.execute(text(ddl))
+                if not existed:
+                    conn.execute(text("INSERT INTO insurance_plans_fts(insurance_plans_fts) VALUES ('rebuild')"))
+            _search_backend = "fts5"
+        elif dialect == "postgresql":
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_insurance_plans_search "
+                    f"ON insurance_plans USING GIN (({_PG_TSVECTOR}))"
+                ))
+            _search_backend = "postgres"
+    except OperationalError as e:
+        logger.warning(f"Full-text search unavailable ({e}); falling back to substring search")
+        _search_backend = None
+
+
+def _search_terms(search: str) -> List[str]:
+    return re.findall(r"\w+", search.lower())
+
+
+def search_plan_ids(db: Session, search: str, limit: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Plan ids matching every word of `search` as a prefix, best match first.
+    Returns None when no full-text backend is available (callers fall back to substring search).
+    """
+    if _search_backend is None:
+        return None
+    terms = _search_terms(search)
+    if not terms:
+        return []
+    if _search_backend == "fts5":
+        sql = (
+            f"SELECT rowid FROM insurance_plans_fts WHERE insurance_plans_fts MATCH :q "
+            f"ORDER BY {_SQLITE_BM25}"
+        )
+        query = " ".join(f'"{t}"*' for t in terms)
+    else:
+        sql = (
+            f"SELECT id FROM insurance_plans WHERE ({_PG_TSVECTOR}) @@ to_tsquery('simple', :q) "
+            f"ORDER BY ts_rank(({_PG_TSVECTOR}), to_tsquery('simple', :q)) DESC, id"
+        )
+        query = " & ".join(f"{t}:*" for t in terms)
+    if limit is not None:
+        sql += " LIMIT :limit"
+    return list(db.execute(text(sql), {"q": query, "limit": limit}).scalars())
+
+
+def search_clause(search: str):
+    """SQL filter restricting InsurancePlan to full-text matches of `search` (None if unavailable)."""
+    if _search_backend is None:
+        return None
+    terms = _search_terms(search)
+    if not terms:
+        return InsurancePlan.id.is_(None)
+    if _search_backend == "fts5":
+        matches = (
+            text("SELECT rowid FROM insurance_plans_fts WHERE insurance_plans_fts MATCH :q")
+            .bindparams(q=" ".join(f'"{t}"*' for t in terms))
+            .columns(column("rowid", Integer))
+        )
+        return InsurancePlan.id.in_(matches)
+    return text(f"({_PG_TSVECTOR}) @@ to_tsquery('simple', :q)").bindparams(
+        q=" & ".join(f"{t}:*" for t in terms)
+    )
 
 
 def get_db():
@@ -1,23 +1,28 @@
 """
 Gemini LLM integration for analyzing and ranking term insurance plans.
-Uses google-generativeai (gemini-1.5-flash) to produce structured recommendations.
+Calls go through google-generativeai via a ModelRouter over _MODEL_FALLBACKS
+(preference order), which picks the fastest healthy model, hedges slow calls
+and skips models that are rate-limited, missing or failing.
 """
 import json
 import logging
 import os
 import re
-from typing import List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import google.generativeai as genai
 from dotenv import load_dotenv
 
+from llm_cache import llm_cache, prompt_hash
+from model_router import ModelRouter
+from prompt_codec import PLAN_TABLE_LEGEND, encode_plan_table, estimate_tokens, plan_for_id
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY", ""))
-_model = genai.GenerativeModel("gemini-2.5-flash-lite")
-
-# Ordered fallback list in case a model hits quota
+# Models in order of preference; model_router.py skips unhealthy ones
 _MODEL_FALLBACKS = [
     "gemini-2.5-flash-lite",
     "gemini-2.5-flash",
@@ -27,24 +32,200 @@ _MODEL_FALLBACKS = [
     "gemini-flash-latest",
 ]
 
+# google.generativeai (grpc, protobuf, google-api-core …) takes ~1s to import,
+# so it is imported and configured on the first LLM call, not at API startup.
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    """The configured google.generativeai module, imported on first use."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY", ""))
+                _genai = genai
+    return _genai
+
+
+# Every call — recommend, stream, compare, chat, estimate — is routed to the
+# best currently healthy model; see model_router.py.
+_router = ModelRouter(_MODEL_FALLBACKS, lambda name: _get_genai().GenerativeModel(name))
+
+
+def router_stats() -> Dict:
+    return _router.stats()
+
+
+class _Flight:
+    """One in-flight upstream call; followers wait on `done`."""
+    __slots__ = ("done", "text", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.text: Optional[str] = None
+        self.error: Optional[Exception] = None
+
+    def wait(self, deadline: Optional[float] = None) -> str:
+        timeout = _FLIGHT_WAIT if deadline is None else min(_FLIGHT_WAIT, max(0.0, deadline - time.monotonic()))
+        if not self.done.wait(timeout):
+            raise TimeoutError("timed out waiting for an identical in-flight Gemini call")
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+
+class _SingleFlight:
+    """
+    Request coalescing: concurrent callers with the same prompt (by hash)
+    share one upstream Gemini call — the first becomes the leader, the rest wait
+    for its reply (or its error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._counts = {"upstream_calls": 0, "collapsed": 0}
+
+    def join(self, key: str) -> Tuple[_Flight, bool]:
+        """(flight, is_leader) for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._counts["collapsed"] += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self._counts["upstream_calls"] += 1
+            return flight, True
+
+    def land(self, key: str, flight: _Flight, text: Optional[str] = None,
+             error: Optional[BaseException] = None):
+        """Publish the leader's outcome and release the key."""
+        with self._lock:
+            self._flights.pop(key, None)
+        if error is not None and not isinstance(error, Exception):
+            error = RuntimeError("identical in-flight Gemini call was abandoned")
+        flight.text, flight.error = text, error
+        flight.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._flights)}
+
+
+_FLIGHT_WAIT = 120                     # seconds a follower waits for the leader's reply
+_single_flight = _SingleFlight()
+
+
+def single_flight_stats() -> Dict:
+    return _single_flight.stats()
+
+
+def _request_options(timeout: Optional[float]) -> Optional[Dict]:
+    return None if timeout is None else {"timeout": max(timeout, 0.1)}
 
-def _get_working_model():
-    """Return the first model that responds without quota errors."""
-    for name in _MODEL_FALLBACKS:
+
+def _generate(prompt: str, parse: Callable[[str], Any] = str, deadline: Optional[float] = None,
+              label: str = "default") -> Any:
+    """
+    parse(model.generate_content(prompt).text) on the best healthy model
+    (hedged, bounded by `deadline`), read through the on-disk LLM cache and
+    coalesced with identical in-flight calls. A reply is only cached once
+    `parse` accepts it.
+    """
+    cached = llm_cache.get(_MODEL_FALLBACKS, prompt)
+    if cached is not None:
         try:
-            m = genai.GenerativeModel(name)
-            m.generate_content("hi")
-            return m
-        except Exception as e:
-            if "404" in str(e) or "not found" in str(e).lower():
-                continue
-            if "429" in str(e) or "quota" in str(e).lower():
-                continue
-    return None
+            return parse(cached[1])
+        except Exception:
+            pass                            # unparseable cached entry: ask again, overwrite it
 
+    key = prompt_hash(prompt)
+    flight, leader = _single_flight.join(key)
+    if not leader:
+        return parse(flight.wait(deadline))
 
-def _build_prompt(user: Dict, plans: List[Dict]) -> str:
-    plans_text = json.dumps(plans, indent=2)
+    def call(model, timeout: Optional[float]) -> Tuple[str, Any]:
+        text = model.generate_content(prompt, request_options=_request_options(timeout)).text.strip()
+        return text, parse(text)
+
+    try:
+        name, (text, result) = _router.call(call, deadline, label)
+    except BaseException as e:
+        _single_flight.land(key, flight, error=e)
+        raise
+    llm_cache.put(name, prompt, text)
+    _single_flight.land(key, flight, text=text)
+    return result
+
+
+class StreamCancelled(RuntimeError):
+    """The consumer of a Gemini stream asked it to stop."""
+
+
+def _generate_stream(prompt: str, accept: Callable[[str], bool] = bool, deadline: Optional[float] = None,
+                     label: str = "default", cancel: Optional[threading.Event] = None) -> Iterator[str]:
+    """
+    Text chunks of the reply to `prompt`: a cached reply, or the reply of an
+    identical call already in flight, replays as one chunk; otherwise the
+    best healthy model streams. The full reply is cached if accept(text).
+    Closing the iterator, or setting `cancel` (checked as each chunk arrives,
+    for consumers that cannot close it from their own thread), stops the
+    upstream stream.
+    """
+    cached = llm_cache.get(_MODEL_FALLBACKS, prompt)
+    if cached is not None:
+        return iter((cached[1],))
+
+    key = prompt_hash(prompt)
+    flight, leader = _single_flight.join(key)
+    if not leader:
+        def replay() -> Iterator[str]:
+            yield flight.wait(deadline)
+        return replay()
+
+    def call(model, timeout: Optional[float]) -> Iterator[str]:
+        for chunk in model.generate_content(prompt, stream=True, request_options=_request_options(timeout)):
+            yield chunk.text
+
+    def stream() -> Iterator[str]:
+        name, parts = None, []
+        chunks = _router.stream(call, deadline, label)
+        try:
+            for name, chunk in chunks:
+                if cancel is not None and cancel.is_set():
+                    raise StreamCancelled("Gemini stream cancelled by its consumer")
+                parts.append(chunk)
+                yield chunk
+        except BaseException as e:
+            _single_flight.land(key, flight, error=e)
+            raise
+        finally:
+            chunks.close()
+        text = "".join(parts)
+        if name is not None and accept(text):
+            llm_cache.put(name, prompt, text)
+        _single_flight.land(key, flight, text=text)
+    return stream()
+
+
+_prompt_lock = threading.Lock()
+_prompt_stats = {"recommend_prompts": 0, "tokens_sent": 0, "tokens_unfiltered": 0}
+
+
+def prompt_stats() -> Dict:
+    """Tokens sent for /api/recommend prompts vs. what the unfiltered plan list would have cost."""
+    with _prompt_lock:
+        stats = dict(_prompt_stats)
+    if stats["tokens_unfiltered"]:
+        stats["tokens_saved_pct"] = round(100 * (1 - stats["tokens_sent"] / stats["tokens_unfiltered"]), 1)
+    return stats
+
+
+def _prompt_context(user: Dict, plans: List[Dict]) -> str:
+    """Profile, plan table and instructions shared by the JSON and streaming recommend prompts."""
     return f"""
 You are an expert Indian term insurance advisor. Analyze the following term insurance plans and recommend the best ones for the user described below.
 
@@ -55,194 +236,266 @@ USER PROFILE:
 - Desired Policy Term: {user['policy_term']} years
 - Minimum Claim Settlement Ratio preferred: {user['min_csr']}%
 
-AVAILABLE PLANS (filtered for this user's age):
-{plans_text}
+AVAILABLE PLANS (pre-selected for this user's age, term, cover, CSR floor and budget):
+{encode_plan_table(plans)}
+{PLAN_TABLE_LEGEND}
 
 INSTRUCTIONS:
 1. Rank ALL plans from best to worst for this specific user.
-2. For each plan provide: rank, plan_name, provider, reason (2-3 sentences explaining why it suits or doesn't suit the user), score (0-100), and a pros/cons list.
+2. For each plan provide: id, reason (2-3 sentences explaining why it suits or doesn't suit the user), score (0-100), and a pros/cons list.
 3. Give an overall_summary paragraph (3-4 sentences) explaining the top recommendation clearly.
 4. Consider: claim settlement ratio, premium affordability, policy term match, sum assured coverage, and key features.
 5. If a plan's premium exceeds the budget, flag it clearly.
+"""
 
-Respond ONLY with valid JSON in this exact format:
-{{
+
+def _build_prompt(user: Dict, plans: List[Dict]) -> str:
+    return _prompt_context(user, plans) + """
+Respond ONLY with valid JSON in this exact format (refer to plans by id):
+{
   "overall_summary": "...",
-  "top_pick": "Plan Name by Provider",
+  "top_pick": 1,
   "ranked_plans": [
-    {{
-      "rank": 1,
-      "plan_name": "...",
-      "provider": "...",
-      "score": 92,
-      "reason": "...",
-      "pros": ["...", "..."],
-      "cons": ["...", "..."],
-      "within_budget": true,
-      "claim_settlement_ratio": 99.5
-    }}
+    {"id": 1, "score": 92, "reason": "...", "pros": ["...", "..."], "cons": ["...", "..."]}
   ]
-}}
+}
 """
 
 
-def analyze_plans(user_inputs: Dict[str, Any], plans: List[Dict]) -> Dict:
-    """
-    Send user inputs + plans to Gemini and return structured recommendation.
-    Falls back to a simple sort-based recommendation if Gemini is unavailable.
-    """
-    if not plans:
-        return {
-            "overall_summary": "No plans available in the database. Please trigger a scrape first.",
-            "top_pick": "N/A",
-            "ranked_plans": [],
-        }
+def _build_stream_prompt(user: Dict, plans: List[Dict]) -> str:
+    """Same request, answered line by line so it can be parsed while it streams."""
+    return _prompt_context(user, plans) + """
+Respond in plain text (no JSON, no markdown), one item per line, in this order:
+SUMMARY: <overall_summary, on a single line>
+TOP: <id of the top pick>
+PLAN: <id> | <score> | <reason> | <pro>; <pro> | <con>; <con>
+Write one PLAN line per plan, best first.
+"""
 
-    # Filter plans suitable for user's age
-    age = user_inputs.get("age", 30)
-    eligible = [
-        p for p in plans if p.get("age_min", 0) <= age <= p.get("age_max", 99)
-    ]
-    if not eligible:
-        eligible = plans  # fallback: use all
-
-    # Build plan dicts for the prompt (only relevant fields)
-    plan_summaries = [
-        {
-            "plan_name": p["plan_name"],
-            "provider": p["provider"],
-            "premium_annual": p["premium_annual"],
-            "sum_assured_min_lakhs": p["sum_assured_min"],
-            "sum_assured_max_lakhs": p["sum_assured_max"],
-            "policy_term_min": p["policy_term_min"],
-            "policy_term_max": p["policy_term_max"],
-            "claim_settlement_ratio": p["claim_settlement_ratio"],
-            "key_features": p.get("key_features", "").split("|"),
-        }
-        for p in eligible
-    ]
 
-    prompt = _build_prompt(user_inputs, plan_summaries)
+def _parse_json(raw: str) -> Dict:
+    """The JSON object in a model reply (handles markdown code blocks)."""
+    json_match = re.search(r"\{.*\}", raw, re.DOTALL)
+    return json.loads(json_match.group() if json_match else raw)
 
-    try:
-        active_model = _model
-        response = active_model.generate_content(prompt)
-        raw = response.text.strip()
 
-        # Extract JSON from response (handles markdown code blocks)
-        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        return json.loads(raw)
+def _ranked_entry(plan: Dict, user: Dict, rank: int, score, reason: str, pros: List, cons: List) -> Dict:
+    return {
+        "rank": rank,
+        "plan_name": plan["plan_name"],
+        "provider": plan["provider"],
+        "score": score,
+        "reason": reason,
+        "pros": pros,
+        "cons": cons,
+        "within_budget": (plan.get("premium_annual") or 0) <= user.get("premium_budget", float("inf")),
+        "claim_settlement_ratio": plan.get("claim_settlement_ratio"),
+    }
+
+
+def _top_pick(top: Optional[Dict], ranked: List[Dict]) -> str:
+    top = top or (ranked[0] if ranked else None)
+    return f"{top['plan_name']} by {top['provider']}" if top else "N/A"
 
-    except Exception as e:
-        # On quota/rate-limit, try other models automatically
-        if "429" in str(e) or "quota" in str(e).lower() or "404" in str(e):
-            logger.warning(f"Primary model failed ({e}). Trying fallback models...")
-            for model_name in _MODEL_FALLBACKS[1:]:
-                try:
-                    m = genai.GenerativeModel(model_name)
-                    response = m.generate_content(prompt)
-                    raw = response.text.strip()
-                    json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-                    if json_match:
-                        return json.loads(json_match.group())
-                    return json.loads(raw)
-                except Exception as fe:
-                    logger.warning(f"Fallback model {model_name} also failed: {fe}")
-                    continue
-        logger.warning(f"All Gemini models failed: {e}. Using rule-based ranking.")
-        return _fallback_ranking(user_inputs, eligible)
-
-
-def _fallback_ranking(user_inputs: Dict, plans: List[Dict]) -> Dict:
-    """Simple rule-based ranking when Gemini is unavailable."""
-    budget = user_inputs.get("premium_budget", float("inf"))
-    min_csr = user_inputs.get("min_csr", 0)
-
-    def score(p):
-        s = p.get("claim_settlement_ratio", 0) * 0.5
-        if p.get("premium_annual", 0) <= budget:
-            s += 30
-        if p.get("claim_settlement_ratio", 0) >= min_csr:
-            s += 20
-        return s
-
-    sorted_plans = sorted(plans, key=score, reverse=True)
-    ranked = []
-    for i, p in enumerate(sorted_plans, 1):
-        within_budget = p.get("premium_annual", 0) <= budget
-        ranked.append(
-            {
-                "rank": i,
-                "plan_name": p["plan_name"],
-                "provider": p["provider"],
-                "score": round(score(p), 1),
-                "reason": (
-                    f"{'Within budget. ' if within_budget else 'Exceeds budget. '}"
-                    f"Claim settlement ratio: {p.get('claim_settlement_ratio', 0)}%."
-                ),
-                "pros": p.get("key_features", "").split("|")[:3],
-                "cons": ["Gemini analysis unavailable — rule-based ranking only"],
-                "within_budget": within_budget,
-                "claim_settlement_ratio": p.get("claim_settlement_ratio", 0),
-            }
-        )
 
-    top = sorted_plans[0] if sorted_plans else {}
+def _decode_recommendation(reply: Dict, user: Dict, plans: List[Dict]) -> Dict:
+    """Expand the model's id-based ranking back into full ranked_plans entries."""
+    ranked, seen = [], set()
+    for entry in reply.get("ranked_plans", []):
+        plan = plan_for_id(plans, entry.get("id"))
+        if plan is None or id(plan) in seen:
+            continue
+        seen.add(id(plan))
+        ranked.append(_ranked_entry(
+            plan, user, len(ranked) + 1, entry.get("score"),
+            entry.get("reason", ""), entry.get("pros", []), entry.get("cons", []),
+        ))
     return {
-        "overall_summary": (
-            f"Based on rule-based analysis (Gemini unavailable), "
-            f"'{top.get('plan_name', 'N/A')}' by {top.get('provider', 'N/A')} "
-            f"ranks highest with a CSR of {top.get('claim_settlement_ratio', 0)}%. "
-            "Please configure your Gemini API key for detailed AI analysis."
-        ),
-        "top_pick": f"{top.get('plan_name', 'N/A')} by {top.get('provider', 'N/A')}",
+        "overall_summary": reply.get("overall_summary", ""),
+        "top_pick": _top_pick(plan_for_id(plans, reply.get("top_pick")), ranked),
         "ranked_plans": ranked,
     }
 
 
-def _normalize_compare_keys(comparison_table: list, plan_names: list) -> list:
+class _StreamedReply:
+    """
+    Incremental parser for the line-oriented streaming reply. feed() takes
+    text chunks as they arrive and yields ("summary", {"text": delta}) while
+    the SUMMARY line grows and ("plan", entry) for each completed PLAN line.
+    """
+
+    def __init__(self, user: Dict, plans: List[Dict]):
+        self.user, self.plans = user, plans
+        self.buffer = ""
+        self.summary = ""
+        self.top: Optional[Dict] = None
+        self.ranked: List[Dict] = []
+        self._seen = set()
+
+    def feed(self, text: str) -> Iterator[Tuple[str, Dict]]:
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            yield from self._line(line)
+        yield from self._summary_delta(self.buffer)
+
+    def close(self) -> Iterator[Tuple[str, Dict]]:
+        line, self.buffer = self.buffer, ""
+        yield from self._line(line)
+
+    def result(self) -> Dict:
+        return {
+            "overall_summary": self.summary,
+            "top_pick": _top_pick(self.top, self.ranked),
+            "ranked_plans": self.ranked,
+        }
+
+    def _summary_delta(self, line: str) -> Iterator[Tuple[str, Dict]]:
+        label, _, text = line.strip().partition(":")
+        if label.strip().upper() == "SUMMARY":
+            text = text.strip()
+            if len(text) > len(self.summary):
+                yield "summary", {"text": text[len(self.summary):]}
+                self.summary = text
+
+    def _line(self, line: str) -> Iterator[Tuple[str, Dict]]:
+        label, _, rest = line.strip().partition(":")
+        label = label.strip().upper()
+        if label == "SUMMARY":
+            yield from self._summary_delta(line)
+        elif label == "TOP":
+            self.top = plan_for_id(self.plans, rest.strip())
+        elif label == "PLAN":
+            cells = [c.strip() for c in rest.split("|")] + [""] * 4
+            plan = plan_for_id(self.plans, cells[0])
+            if plan is None or id(plan) in self._seen:
+                return
+            self._seen.add(id(plan))
+            try:
+                score = float(cells[1])
+            except ValueError:
+                score = None
+            entry = _ranked_entry(
+                plan, self.user, len(self.ranked) + 1, score, cells[2],
+                [x.strip() for x in cells[3].split(";") if x.strip()],
+                [x.strip() for x in cells[4].split(";") if x.strip()],
+            )
+            self.ranked.append(entry)
+            yield "plan", entry
+
+
+def _count_prompt_tokens(prompt: str, build, user: Dict, plans: List[Dict], unfiltered: Optional[List[Dict]]) -> Dict:
+    """Estimate, log and record the tokens of a recommend prompt (and of its unfiltered variant)."""
+    tokens = {"sent": estimate_tokens(prompt), "plans_sent": len(plans)}
+    if unfiltered is not None:
+        tokens["unfiltered"] = estimate_tokens(build(user, unfiltered))
+        tokens["plans_unfiltered"] = len(unfiltered)
+    with _prompt_lock:
+        _prompt_stats["recommend_prompts"] += 1
+        _prompt_stats["tokens_sent"] += tokens["sent"]
+        _prompt_stats["tokens_unfiltered"] += tokens.get("unfiltered", tokens["sent"])
+    logger.info(
+        f"Recommend prompt: {len(plans)} plans, ~{tokens['sent']} tokens"
+        + (f" (all {len(unfiltered)} eligible plans: ~{tokens['unfiltered']})" if unfiltered is not None else "")
+    )
+    return tokens
+
+
+def analyze_plans(
+    user_inputs: Dict[str, Any], plans: List[Dict], unfiltered: Optional[List[Dict]] = None,
+    deadline: Optional[float] = None,
+) -> Optional[Dict]:
+    """
+    Send user inputs + a shortlist of plans (pre-selected and pre-ranked by
+    ranking.py) to Gemini and return its structured recommendation, or None
+    if every model fails or `deadline` (time.monotonic()) passes — the caller
+    then serves the local ranking. `unfiltered` is the full eligible list,
+    only used to report tokens saved.
+    """
+    if not plans:
+        return None
+
+    prompt = _build_prompt(user_inputs, plans)
+    tokens = _count_prompt_tokens(prompt, _build_prompt, user_inputs, plans, unfiltered)
+
+    try:
+        reply = _generate(prompt, _parse_json, deadline, "recommend")
+        return {**_decode_recommendation(reply, user_inputs, plans), "prompt_tokens": tokens}
+    except Exception as e:
+        logger.warning(f"Gemini recommendation failed: {e}. Using local ranking.")
+        return None
+
+
+def stream_recommendation(
+    user_inputs: Dict[str, Any], plans: List[Dict], unfiltered: Optional[List[Dict]] = None,
+    deadline: Optional[float] = None,
+) -> Iterator[Tuple[str, Dict]]:
     """
-    Gemini often invents slightly different plan-name keys in the values dict.
-    This re-maps every key back to the exact plan_name strings we passed in.
+    Streaming counterpart of analyze_plans. Yields ("summary", {"text": delta})
+    and ("plan", entry) events while Gemini generates, then either
+    ("result", recommendation) or ("error", {"detail": ...}) if no model
+    produced a usable reply before `deadline`. A model that fails before its
+    first chunk is replaced by the next healthy one.
     """
-    for row in comparison_table:
-        raw = row.get("values")
-        if not isinstance(raw, dict):
+    if not plans:
+        yield "error", {"detail": "No plans to analyze"}
+        return
+    prompt = _build_stream_prompt(user_inputs, plans)
+    tokens = _count_prompt_tokens(prompt, _build_stream_prompt, user_inputs, plans, unfiltered)
+
+    def accept(text: str) -> bool:
+        check = _StreamedReply(user_inputs, plans)
+        list(check.feed(text))
+        list(check.close())
+        return bool(check.result()["ranked_plans"])
+
+    reply = _StreamedReply(user_inputs, plans)
+    try:
+        for chunk in _generate_stream(prompt, accept, deadline, "recommend_stream"):
+            yield from reply.feed(chunk)
+        yield from reply.close()
+        result = reply.result()
+        if not result["ranked_plans"]:
+            raise ValueError("reply contained no PLAN lines")
+    except Exception as e:
+        logger.warning(f"Streaming recommendation failed: {e}. Using local ranking.")
+        yield "error", {"detail": "AI analysis unavailable — showing the local ranking."}
+        return
+    yield "result", {**result, "prompt_tokens": tokens}
+
+
+def _decode_comparison(reply: Dict, plans: List[Dict]) -> Dict:
+    """Map the model's table ids in its verdict and per-plan notes back onto the plans' own ids."""
+    detailed, seen = [], set()
+    for entry in reply.get("plans", []):
+        plan = plan_for_id(plans, entry.get("id"))
+        if plan is None or id(plan) in seen:
             continue
-        normalized: dict = {}
-        for exact_name in plan_names:
-            if exact_name in raw:
-                normalized[exact_name] = raw[exact_name]
-                continue
-            # Case-insensitive exact
-            lower = exact_name.lower()
-            matched = next((v for k, v in raw.items() if k.lower() == lower), None)
-            if matched is not None:
-                normalized[exact_name] = matched
-                continue
-            # Word-overlap fuzzy match
-            exact_words = set(exact_name.lower().split())
-            best_val, best_score = None, 0.0
-            for key, val in raw.items():
-                key_words = set(key.lower().split())
-                overlap = len(exact_words & key_words) / max(len(exact_words | key_words), 1)
-                if overlap > best_score:
-                    best_score, best_val = overlap, val
-            if best_val is not None and best_score > 0.25:
-                normalized[exact_name] = best_val
-        row["values"] = normalized
-    return comparison_table
-
-
-def compare_specific_plans(user_profile: Dict, plans: List[Dict]) -> Dict:
-    """Compare 2–3 plans side-by-side using Gemini AI."""
-    plan_names = [p["plan_name"] for p in plans]
-    plans_text = json.dumps(plans, indent=2)
-    # Build explicit key list so Gemini uses EXACT names
-    keys_csv = ", ".join(f'"{n}"' for n in plan_names)
-    prompt = f"""You are an expert Indian term insurance advisor. Compare the following plans side-by-side for this user.
+        seen.add(id(plan))
+        detailed.append({
+            "plan_id": plan["id"],
+            "plan_name": plan["plan_name"],
+            "provider": plan["provider"],
+            "strengths": entry.get("strengths", []),
+            "weaknesses": entry.get("weaknesses", []),
+            "best_for": entry.get("best_for", ""),
+        })
+    if not reply.get("verdict") or not detailed:
+        raise ValueError("reply has no verdict or per-plan notes")
+    winner = plan_for_id(plans, reply.get("winner")) or plans[0]
+    return {"verdict": reply["verdict"], "winner": winner["plan_name"], "winner_id": winner["id"],
+            "detailed_comparison": detailed}
+
+
+def compare_specific_plans(user_profile: Dict, plans: List[Dict], deadline: Optional[float] = None) -> Optional[Dict]:
+    """
+    Gemini's verdict on 2–3 plans: the winner and per-plan strengths,
+    weaknesses and best-for text. The side-by-side table is built locally
+    (Ranking.as_comparison), so the model only writes prose and refers to plans
+    by table id. `plans` carry their snapshot "id", which the result uses.
+    Returns None if every model fails or `deadline` passes.
+    """
+    prompt = f"""You are an expert Indian term insurance advisor. Compare the following plans for this user.
 
 USER PROFILE:
 - Age: {user_profile.get('age')} years
@@ -250,56 +503,30 @@ USER PROFILE:
 - Premium Budget: ₹{user_profile.get('premium_budget')}/year
 - Policy Term: {user_profile.get('policy_term')} years
 
-PLANS TO COMPARE:
-{plans_text}
+PLANS TO COMPARE (prem = indicative annual premium at the user's age):
+{encode_plan_table(plans)}
+{PLAN_TABLE_LEGEND}
 
-IMPORTANT: In the "values" dict of each comparison_table row, use EXACTLY these keys (copy verbatim):
-{keys_csv}
-
-Respond ONLY with valid JSON in this exact format:
+Respond ONLY with valid JSON in this exact format, referring to plans by id:
 {{
-  "verdict": "2-3 sentences on overall winner and why",
-  "winner": "Plan Name",
-  "comparison_table": [
-    {{
-      "aspect": "Claim Settlement Ratio",
-      "values": {{{", ".join(f'"{n}": "value"' for n in plan_names)}}},
-      "winner_plan": "{plan_names[0]}",
-      "why": "Higher CSR means more reliable claim payments"
-    }}
-  ],
-  "detailed_comparison": [
-    {{
-      "plan_name": "...",
-      "provider": "...",
-      "strengths": ["...", "..."],
-      "weaknesses": ["...", "..."],
-      "best_for": "..."
-    }}
+  "verdict": "2-3 sentences on the overall winner and why",
+  "winner": 1,
+  "plans": [
+    {{"id": 1, "strengths": ["...", "..."], "weaknesses": ["...", "..."], "best_for": "..."}}
   ]
 }}
-Include aspects: Claim Settlement Ratio, Annual Premium (approx. for ₹{user_profile.get('sum_assured')} Lakhs, {user_profile.get('policy_term')} years), Sum Assured Range, Policy Term, Key Features, Value for Money (within your budget for ₹{user_profile.get('sum_assured')} Lakhs, {user_profile.get('policy_term')} years)."""
+Include one "plans" entry per plan."""
     try:
-        response = _model.generate_content(prompt)
-        raw = response.text.strip()
-        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-        result = json.loads(json_match.group() if json_match else raw)
-        # Normalize keys in comparison table to match exact plan names
-        if "comparison_table" in result:
-            result["comparison_table"] = _normalize_compare_keys(result["comparison_table"], plan_names)
-        return result
+        return _generate(prompt, lambda text: _decode_comparison(_parse_json(text), plans), deadline, "compare")
     except Exception as e:
-        logger.warning(f"Compare failed: {e}")
-        return {
-            "verdict": "Comparison unavailable. Please check your API key.",
-            "winner": plans[0]["plan_name"] if plans else "N/A",
-            "comparison_table": [],
-            "detailed_comparison": [],
-        }
+        logger.warning(f"Compare failed: {e}. Using the local comparison.")
+        return None
 
 
-def chat_with_advisor(message: str, user_profile: Dict, top_plans: List[Dict]) -> str:
-    """Answer follow-up insurance questions using Gemini AI."""
+_CHAT_UNAVAILABLE = "I'm unable to answer right now. Please check your Gemini API key or try again."
+
+
+def _chat_prompt(message: str, user_profile: Dict, top_plans: List[Dict]) -> str:
     context_parts = []
     if user_profile:
         context_parts.append(
@@ -311,54 +538,104 @@ def chat_with_advisor(message: str, user_profile: Dict, top_plans: List[Dict]) -
         context_parts.append(f"Top plans shown: {names}")
 
     context = "\n".join(context_parts)
-    prompt = f"""You are a helpful, friendly Indian term insurance advisor. Answer concisely in 2–4 sentences.
+    return f"""You are a helpful, friendly Indian term insurance advisor. Answer concisely in 2–4 sentences.
 Be practical and specific to the Indian insurance market. No markdown, plain text only.
 
 {context}
 
 User question: {message}"""
+
+
+def chat_with_advisor(message: str, user_profile: Dict, top_plans: List[Dict],
+                      deadline: Optional[float] = None) -> str:
+    """Answer follow-up insurance questions using Gemini AI."""
     try:
-        response = _model.generate_content(prompt)
-        return response.text.strip()
+        return _generate(_chat_prompt(message, user_profile, top_plans), deadline=deadline, label="chat")
     except Exception as e:
         logger.warning(f"Chat failed: {e}")
-        return "I'm unable to answer right now. Please check your Gemini API key or try again."
-
+        return _CHAT_UNAVAILABLE
 
-def estimate_premium_range(age: int, sum_assured: float, policy_term: int) -> Dict:
-    """Estimate annual premium range using Gemini or rule-based calculation."""
-    prompt = f"""Estimate the annual premium range in INR for an Indian non-smoker, healthy individual:
-- Age: {age} years
-- Sum Assured: ₹{sum_assured} Lakhs
-- Policy Term: {policy_term} years
 
-Respond ONLY with valid JSON:
-{{
-  "min_premium": 8000,
-  "max_premium": 15000,
-  "typical_premium": 11000,
-  "factors": ["Age {age} - moderate risk", "Coverage ₹{sum_assured}L", "{policy_term} year term"],
-  "tip": "One sentence tip to reduce premium"
-}}"""
+def stream_chat(message: str, user_profile: Dict, top_plans: List[Dict], deadline: Optional[float] = None,
+                cancel: Optional[threading.Event] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Streaming counterpart of chat_with_advisor. Yields ("token", {"text": delta})
+    as Gemini generates, then ("done", {"reply": full text}) — or ("error",
+    {"detail": ...}) if no model answered before `deadline`. Stops reading from
+    the model once closed or once `cancel` is set.
+    """
+    parts = []
     try:
-        response = _model.generate_content(prompt)
-        raw = response.text.strip()
-        json_match = re.search(r"\{.*\}", raw, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        return json.loads(raw)
-    except Exception:
-        # Rule-based fallback
-        base = 0.0006 + max(0, age - 25) * 0.00003
-        annual = base * sum_assured * 100000
-        return {
-            "min_premium": int(annual * 0.7),
-            "max_premium": int(annual * 1.4),
-            "typical_premium": int(annual),
-            "factors": [
-                f"Age {age} — {'low' if age < 35 else 'moderate' if age < 50 else 'higher'} risk",
-                f"Coverage ₹{sum_assured}L",
-                f"{policy_term} year term",
-            ],
-            "tip": "Buying at a younger age and maintaining a healthy lifestyle significantly reduces your premium.",
-        }
+        for chunk in _generate_stream(_chat_prompt(message, user_profile, top_plans), deadline=deadline,
+                                      label="chat_stream", cancel=cancel):
+            if chunk:
+                parts.append(chunk)
+                yield "token", {"text": chunk}
+    except StreamCancelled:
+        return
+    except Exception as e:
+        logger.warning(f"Streaming chat failed: {e}")
+        yield "error", {"detail": _CHAT_UNAVAILABLE}
+        return
+    yield "done", {"reply": "".join(parts)}
+
+
+# ── Premium tips ─────────────────────────────────────────────────────────────
+# /api/premium-estimate is answered by premium_model.py; Gemini only adds a
+# one-sentence tip, and only from the LLM cache. A miss returns None at once and
+# the tip is generated in the background for the next visitor in that bucket.
+_tip_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-tip")
+_tip_pending: set = set()
+_tip_lock = threading.Lock()
+
+
+def _tip_prompt(age: int, sum_assured: float, policy_term: int) -> str:
+    # Bucketed (5-year age / term bands, cover rounded down to 25 L / 1 Cr steps) so tips are shared
+    cover = sum_assured // 100 * 100 if sum_assured >= 100 else max(25, sum_assured // 25 * 25)
+    return f"""You are an Indian term insurance advisor. Give ONE practical sentence (plain text, no markdown)
+on how this person could lower their term insurance premium or choose cover wisely:
+- Age: {age // 5 * 5}–{age // 5 * 5 + 4} years, non-smoker
+- Sum Assured: about ₹{cover:g} Lakhs
+- Policy Term: about {policy_term // 5 * 5} years"""
+
+
+def _parse_tip(text: str) -> str:
+    tip = text.strip().strip('"').strip()
+    if not tip:
+        raise ValueError("empty tip")
+    return tip
+
+
+def _warm_tip(prompt: str, budget: float):
+    # The budget starts when the single tip worker picks the job up, not when it was
+    # queued: a backlog would otherwise hand every queued job an already-expired deadline
+    deadline = time.monotonic() + budget if budget > 0 else None
+    try:
+        _generate(prompt, _parse_tip, deadline, "tip")
+    except Exception as e:
+        logger.info(f"Premium tip not generated: {e}")
+    finally:
+        with _tip_lock:
+            _tip_pending.discard(prompt)
+
+
+def premium_tip(age: int, sum_assured: float, policy_term: int, budget: float = 0) -> Optional[str]:
+    """
+    Gemini's cached tip for this profile bucket, or None (and a background request
+    to fill the cache, given `budget` seconds once it starts; 0 = no deadline).
+    """
+    if not llm_cache.enabled:
+        return None
+    prompt = _tip_prompt(age, sum_assured, policy_term)
+    cached = llm_cache.get(_MODEL_FALLBACKS, prompt)
+    if cached is not None:
+        try:
+            return _parse_tip(cached[1])
+        except ValueError:
+            pass
+    with _tip_lock:
+        if prompt in _tip_pending:
+            return None
+        _tip_pending.add(prompt)
+    _tip_pool.submit(_warm_tip, prompt, budget)
+    return None
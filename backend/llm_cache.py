@@ -0,0 +1,155 @@
+"""
+Persistent, content-addressed cache of Gemini responses.
+
+Responses are keyed by (model name, SHA-256 of the prompt) and stored in a
+local SQLite file in WAL mode, so every uvicorn worker — and the next restart —
+reuses answers already paid for. Entries expire after LLM_CACHE_TTL seconds and
+the least recently used ones are evicted beyond LLM_CACHE_MAX_ENTRIES.
+Lookups accept a reply from any of the given models, in preference order.
+
+  LLM_CACHE_PATH=./llm_cache.db     # empty disables the cache
+  LLM_CACHE_TTL=86400
+  LLM_CACHE_MAX_ENTRIES=5000
+
+The cache never fails a request: any SQLite error is logged and treated as a miss.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from settings import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    model       TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (model, prompt_hash)
+);
+CREATE INDEX IF NOT EXISTS ix_llm_responses_last_used ON llm_responses (last_used);
+"""
+_EVICT_EVERY = 50          # puts between eviction sweeps (fewer for small caches)
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache, safe to share across threads and processes."""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = bool(path) and ttl_seconds > 0 and max_entries > 0
+        self._sweep_every = max(1, min(_EVICT_EVERY, max_entries // 10))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._counts[key] += n
+
+    def get(self, models: Sequence[str], prompt: str) -> Optional[Tuple[str, str]]:
+        """(model, response) for the first of `models` with a live entry for `prompt`."""
+        if not self.enabled or not models:
+            return None
+        key, now = prompt_hash(prompt), time.time()
+        try:
+            conn = self._conn()
+            rows = dict(conn.execute(
+                f"SELECT model, response FROM llm_responses WHERE prompt_hash = ? AND expires_at > ? "
+                f"AND model IN ({', '.join('?' * len(models))})",
+                (key, now, *models),
+            ).fetchall())
+            hit = next(((m, rows[m]) for m in models if m in rows), None)
+            if hit is not None:
+                conn.execute(
+                    "UPDATE llm_responses SET last_used = ? WHERE model = ? AND prompt_hash = ?",
+                    (now, hit[0], key),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            self._count("errors")
+            return None
+        self._count("hits" if hit is not None else "misses")
+        return hit
+
+    def put(self, model: str, prompt: str, response: str):
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(model, prompt_hash, response, created_at, expires_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (model, prompt_hash(prompt), response, now, now + self.ttl_seconds, now),
+            )
+            with self._lock:
+                self._counts["writes"] += 1
+                sweep = self._counts["writes"] % self._sweep_every == 0
+            if sweep:
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+            self._count("errors")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed = conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM llm_responses WHERE rowid IN ("
+                "  SELECT rowid FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if removed:
+            self._count("evictions", removed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counts)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        if self.enabled:
+            try:
+                stats["entries"] = self._conn().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        return stats
+
+
+llm_cache = LLMCache(
+    path=os.getenv("LLM_CACHE_PATH", "./llm_cache.db"),
+    ttl_seconds=env_float("LLM_CACHE_TTL", 86400),
+    max_entries=env_int("LLM_CACHE_MAX_ENTRIES", 5000),
+)
@@ -1,21 +1,41 @@
 """
 FastAPI backend for Term Insurance Analyzer.
 """
+import base64
+import json
 import logging
 import os
+import threading
+import time
 from contextlib import asynccontextmanager
-from typing import List, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import islice
+from typing import Annotated, AsyncIterator, Iterator, List, Optional, Tuple
 
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from sqlalchemy import func
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from database import init_db, get_db, InsurancePlan
-from gemini_analyzer import analyze_plans, compare_specific_plans, chat_with_advisor, estimate_premium_range
-from scraper.scheduler import run_scrape_job, start_scheduler
+from database import init_db, get_db, bump_catalog_version, InsurancePlan, SessionLocal, search_clause, search_plan_ids
+from gemini_analyzer import (
+    analyze_plans, compare_specific_plans, chat_with_advisor, premium_tip,
+    prompt_stats, router_stats, single_flight_stats, stream_chat, stream_recommendation,
+)
+from plan_snapshot import ANALYSIS_FIELDS, PlanSnapshot, apply_plan_change, current_snapshot, record_digest, refresh_snapshot
+from premium_model import estimate_premium, premium_grid
+from ranking import Ranking, plan_matrix, rank_plans, rank_profiles, rank_selected
+from llm_cache import llm_cache
+from recommend_cache import recommendation_cache
+from settings import env_float, env_int
+from scraper.scheduler import run_scrape_job, scrape_status, seed_if_empty, start_scheduler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,8 +47,9 @@ scheduler = None
 async def lifespan(app: FastAPI):
     global scheduler
     init_db()
-    run_scrape_job()          # seed + scrape on startup
-    scheduler = start_scheduler()
+    seed_if_empty()           # serve seed data (or the persisted plans) right away
+    refresh_snapshot()
+    scheduler = start_scheduler(run_now=True)   # initial scrape runs in the background
     yield
     if scheduler:
         scheduler.shutdown(wait=False)
@@ -51,6 +72,7 @@ app.add_middleware(
     allow_credentials=False if "*" in _allowed_origins else True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Plan-Version", "X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
 
@@ -112,6 +134,9 @@ class RecommendRequest(BaseModel):
     premium_budget: float = Field(..., gt=0, description="Max annual premium in INR")
     policy_term: int = Field(..., ge=5, le=50, description="Desired policy term in years")
     min_csr: float = Field(95.0, ge=0, le=100, description="Minimum claim settlement ratio %")
+    use_ai: Optional[bool] = Field(
+        None, description="Enrich the local ranking with Gemini (default: RECOMMEND_USE_AI)"
+    )
 
 
 class RecommendResponse(BaseModel):
@@ -119,10 +144,23 @@ class RecommendResponse(BaseModel):
     top_pick: str
     ranked_plans: list
     total_plans_analyzed: int
+    engine: str = "local"                 # "gemini" or "local"
+    prompt_tokens: Optional[dict] = None  # estimated tokens sent vs. the unfiltered plan list (gemini only)
+    plan_version: int
+
+
+_BATCH_MAX_PROFILES = env_int("RECOMMEND_BATCH_MAX_PROFILES", 10000)
+
+
+class BatchRecommendRequest(BaseModel):
+    profiles: List[RecommendRequest] = Field(..., min_length=1, max_length=_BATCH_MAX_PROFILES)
+    top_n: Optional[int] = Field(None, ge=1, description="Only return the N best plans per profile")
 
 
 class CompareRequest(BaseModel):
-    plan_names: List[str] = Field(..., description="2–3 plan names to compare")
+    plan_names: List[str] = Field(
+        ..., description='2–3 plans to compare, each "plan name" or, where providers share a name, "plan name (provider)"'
+    )
     user_profile: RecommendRequest
 
 
@@ -138,111 +176,499 @@ class PremiumEstimateRequest(BaseModel):
     policy_term: int = Field(..., ge=5, le=50)
 
 
+_GRID_MAX_POINTS = env_int("PREMIUM_GRID_MAX_POINTS", 20000)
+
+
+class PremiumGridRequest(BaseModel):
+    ages: List[Annotated[float, Field(ge=18, le=70)]] = Field(default_factory=lambda: list(range(18, 71)), min_length=1)
+    sum_assured: List[Annotated[float, Field(ge=25, le=2000)]] = Field([100], min_length=1, description="₹ Lakhs")
+    policy_terms: List[Annotated[float, Field(ge=5, le=50)]] = Field([30], min_length=1)
+    providers: Optional[List[str]] = Field(None, description="Only these providers (default: all)")
+
+
 # ── Endpoints ────────────────────────────────────────────────────────────────
 
+def _versioned(response: Response, snap: PlanSnapshot) -> PlanSnapshot:
+    """Tag the response with the plan snapshot version it was served from."""
+    response.headers["X-Plan-Version"] = str(snap.version)
+    return snap
+
+
+def _not_modified(
+    request: Request, response: Response, snap: PlanSnapshot, etag: str, last_modified: Optional[datetime]
+) -> Optional[Response]:
+    """
+    Attach ETag / Last-Modified validators to `response` and, if the client's
+    If-None-Match (preferred) or If-Modified-Since says its copy is current,
+    return a bare 304 so the caller can skip filtering and serialization.
+    """
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache", "X-Plan-Version": str(snap.version)}
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        fresh = "*" in tags or headers["ETag"] in tags
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            fresh = last_modified <= parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+    return Response(status_code=304, headers=headers) if fresh else None
+
+
 @app.get("/api/health")
 def health():
     return {"status": "ok", "message": "Term Insurance Analyzer API is running", "version": "2.0.0"}
 
 
+@app.get("/api/ready")
+def ready():
+    """
+    Readiness: 200 once the first scrape since startup has finished, 503 while the
+    API is still serving seed / previously persisted data.
+    """
+    status = scrape_status()
+    snap = current_snapshot()
+    body = {
+        "ready": status["runs_completed"] > 0,
+        "fresh_data": status["last_fresh_data_at"] is not None,
+        "scrape_running": status["running"],
+        "last_scrape_started_at": status["last_started_at"],
+        "last_scrape_finished_at": status["last_finished_at"],
+        "last_fresh_data_at": status["last_fresh_data_at"],
+        "total_plans": snap.stats["total_plans"],
+        "plan_version": snap.version,
+    }
+    return JSONResponse(jsonable_encoder(body), status_code=200 if body["ready"] else 503)
+
+
+_STREAM_CHUNK = 500
+
+
+def _encode_cursor(claim_settlement_ratio: float, plan_id: int) -> str:
+    raw = json.dumps([claim_settlement_ratio, plan_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        csr, plan_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(csr), int(plan_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @app.get("/api/plans", response_model=List[PlanOut])
 def get_plans(
+    request: Request,
+    response: Response,
     source: Optional[str] = None,
     min_csr: Optional[float] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
 ):
-    """List all stored insurance plans with optional filters."""
+    """
+    List all stored insurance plans with optional filters, sorted by CSR (then id).
+    With `limit`, returns one page and an X-Next-Cursor header for the next one.
+    With `search`, plans are prefix-matched on name, provider and key features
+    and returned best match first (`limit` keeps the top matches; no cursor).
+    """
+    if search and cursor:
+        raise HTTPException(status_code=400, detail="cursor cannot be combined with search")
+    snap = current_snapshot()
+    not_modified = _not_modified(request, response, snap, snap.digest, snap.last_modified)
+    if not_modified:
+        return not_modified
+
+    candidates = islice(snap.plans, snap.keyset_start(*_decode_cursor(cursor)) if cursor else 0, None)
+    term = None
+    if search:
+        with SessionLocal() as db:
+            ranked_ids = search_plan_ids(db, search)
+        if ranked_ids is None:          # no full-text index: substring match in CSR order
+            term = search.casefold()
+        else:
+            candidates = (snap.by_id[i] for i in ranked_ids if i in snap.by_id)
+    plans = (
+        p for p in candidates
+        if (not source or p.source == source)
+        and (min_csr is None or p.claim_settlement_ratio >= min_csr)
+        and (term is None or term in p.plan_name.casefold() or term in p.provider.casefold())
+    )
+    if limit is None:
+        return list(plans)
+
+    page = list(islice(plans, limit + 1))
+    if len(page) > limit:
+        page = page[:limit]
+        if not search:
+            response.headers["X-Next-Cursor"] = _encode_cursor(page[-1].claim_settlement_ratio, page[-1].id)
+    return page
+
+
+def _plan_page_query(
+    db: Session,
+    source: Optional[str],
+    min_csr: Optional[float],
+    search: Optional[str],
+    after: Optional[Tuple[float, int]] = None,
+):
+    """One keyset page of plans in listing order (CSR desc, id); `after` is the last (csr, id) seen."""
     query = db.query(InsurancePlan)
     if source:
         query = query.filter(InsurancePlan.source == source)
     if min_csr is not None:
         query = query.filter(InsurancePlan.claim_settlement_ratio >= min_csr)
     if search:
-        term = f"%{search}%"
+        clause = search_clause(search)
+        if clause is None:
+            term = f"%{search}%"
+            clause = (InsurancePlan.plan_name.ilike(term)) | (InsurancePlan.provider.ilike(term))
+        query = query.filter(clause)
+    if after is not None:
+        csr, last_id = after
         query = query.filter(
-            (InsurancePlan.plan_name.ilike(term)) |
-            (InsurancePlan.provider.ilike(term))
+            InsurancePlan.claim_settlement_ratio <= csr,     # range bound the CSR index can seek on
+            or_(InsurancePlan.claim_settlement_ratio < csr, InsurancePlan.id > last_id),
         )
-    plans = query.order_by(InsurancePlan.claim_settlement_ratio.desc()).all()
-    return plans
+    return query.order_by(InsurancePlan.claim_settlement_ratio.desc(), InsurancePlan.id).limit(_STREAM_CHUNK)
+
+
+def _iter_plan_rows(source: Optional[str], min_csr: Optional[float], search: Optional[str]) -> Iterator[str]:
+    """Yield NDJSON lines straight from the DB, one keyset-paged chunk at a time."""
+    db = SessionLocal()
+    try:
+        after = None
+        while True:
+            rows = _plan_page_query(db, source, min_csr, search, after).all()
+            for row in rows:
+                yield PlanOut.model_validate(row).model_dump_json() + "\n"
+            if len(rows) < _STREAM_CHUNK:
+                break
+            after = (rows[-1].claim_settlement_ratio, rows[-1].id)
+            db.expunge_all()            # keep the identity map (and memory) flat
+    finally:
+        db.close()
+
+
+@app.get("/api/plans/stream")
+def stream_plans(
+    source: Optional[str] = None,
+    min_csr: Optional[float] = None,
+    search: Optional[str] = None,
+):
+    """Stream every matching plan as NDJSON (one PlanOut per line), read from the DB in chunks."""
+    return StreamingResponse(_iter_plan_rows(source, min_csr, search), media_type="application/x-ndjson")
+
+
+def _use_ai(requested: Optional[bool]) -> bool:
+    """Per-request use_ai flag, else RECOMMEND_USE_AI (off by default: Gemini is opt-in)."""
+    if requested is not None:
+        return requested
+    return os.getenv("RECOMMEND_USE_AI", "false").lower() in ("1", "true", "yes")
+
+
+_LLM_SHORTLIST_SIZE = env_int("LLM_SHORTLIST_SIZE", 10)
+_LLM_BUDGET_TOLERANCE = env_float("LLM_BUDGET_TOLERANCE", 0.2)
+
+# Seconds each endpoint may wait for Gemini before serving its fallback (0 = no deadline)
+_LLM_DEADLINES = {
+    "recommend": env_float("LLM_DEADLINE_RECOMMEND", 8),
+    "recommend_stream": env_float("LLM_DEADLINE_RECOMMEND_STREAM", 30),
+    "compare": env_float("LLM_DEADLINE_COMPARE", 20),
+    "chat": env_float("LLM_DEADLINE_CHAT", 15),
+    "chat_stream": env_float("LLM_DEADLINE_CHAT_STREAM", 30),
+    "tip": env_float("LLM_DEADLINE_TIP", 20),
+}
+
+
+def _deadline(endpoint: str) -> Optional[float]:
+    """time.monotonic() by which `endpoint`'s Gemini call must have answered, counted from now."""
+    budget = _LLM_DEADLINES[endpoint]
+    return time.monotonic() + budget if budget > 0 else None
+
+
+def _recommend_result(snap: PlanSnapshot, ranking: Ranking, use_ai: bool, top_n: Optional[int] = None,
+                      deadline: Optional[float] = None) -> dict:
+    """
+    Gemini's take on a local ranking when use_ai is set and a model answers
+    before `deadline` (served from recommendation_cache when possible), else
+    the ranking itself.
+    Only the local shortlist goes into the prompt; the rest of the plans follow
+    Gemini's ranking in local order.
+    """
+    if use_ai:
+        result = recommendation_cache.get(snap.version, ranking.profile)
+        if result is None:
+            shortlist = ranking.shortlist(_LLM_SHORTLIST_SIZE, _LLM_BUDGET_TOLERANCE)
+            result = analyze_plans(
+                dict(ranking.profile),
+                ranking.as_dicts(shortlist),
+                unfiltered=ranking.as_dicts(ranking.plans),
+                deadline=deadline,
+            )
+            if result is not None:
+                result["ranked_plans"] = ranking.merge_head(result.get("ranked_plans", []))
+                result["engine"] = "gemini"
+                recommendation_cache.put(snap.version, ranking.profile, result)
+        if result is not None:
+            if top_n:
+                result = {**result, "ranked_plans": result.get("ranked_plans", [])[:top_n]}
+            return result
+    return ranking.as_result(top_n)
+
+
+def _recommend_response(snap: PlanSnapshot, result: dict) -> RecommendResponse:
+    return RecommendResponse(
+        overall_summary=result.get("overall_summary", ""),
+        top_pick=result.get("top_pick", ""),
+        ranked_plans=result.get("ranked_plans", []),
+        total_plans_analyzed=len(snap.plans),
+        engine=result["engine"],
+        prompt_tokens=result.get("prompt_tokens"),
+        plan_version=snap.version,
+    )
 
 
 @app.post("/api/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest, db: Session = Depends(get_db)):
-    """Analyze plans for the given user profile using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    if not plans:
+def recommend(req: RecommendRequest, response: Response):
+    """Rank plans for the given user profile locally, optionally enriched by Gemini AI."""
+    deadline = _deadline("recommend")
+    snap = _versioned(response, current_snapshot())
+    if not snap.plans:
         raise HTTPException(
             status_code=404,
             detail="No plans in database. Trigger /api/scrape first.",
         )
 
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "source": p.source,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
-
-    result = analyze_plans(req.model_dump(), plans_data)
+    ranking = rank_plans(snap, req.model_dump(exclude={"use_ai"}))
+    return _recommend_response(snap, _recommend_result(snap, ranking, _use_ai(req.use_ai), deadline=deadline))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+def _iter_recommend_events(snap: PlanSnapshot, req: RecommendRequest) -> Iterator[str]:
+    """
+    Server-sent events for /api/recommend/stream:
+      ranking — the local ranking, sent before any LLM work
+      summary — {"text": …} deltas of Gemini's overall_summary as it is generated
+      plan    — each of Gemini's ranked plans as soon as its line is complete
+      error   — Gemini unavailable or past its deadline (the local ranking stands)
+      done    — the final RecommendResponse (same body as POST /api/recommend)
+    """
+    deadline = _deadline("recommend_stream")
+    ranking = rank_plans(snap, req.model_dump(exclude={"use_ai"}))
+    local = ranking.as_result()
+    yield _sse("ranking", _recommend_response(snap, local))
+    if not _use_ai(req.use_ai):
+        yield _sse("done", _recommend_response(snap, local))
+        return
+
+    result = recommendation_cache.get(snap.version, ranking.profile)
+    if result is None:
+        shortlist = ranking.shortlist(_LLM_SHORTLIST_SIZE, _LLM_BUDGET_TOLERANCE)
+        events = stream_recommendation(
+            dict(ranking.profile),
+            ranking.as_dicts(shortlist),
+            unfiltered=ranking.as_dicts(ranking.plans),
+            deadline=deadline,
+        )
+        for event, payload in events:
+            if event == "result":
+                result = {**payload, "engine": "gemini"}
+                result["ranked_plans"] = ranking.merge_head(payload["ranked_plans"])
+                recommendation_cache.put(snap.version, ranking.profile, result)
+            else:
+                yield _sse(event, payload)
+    yield _sse("done", _recommend_response(snap, result or local))
+
+
+@app.post("/api/recommend/stream")
+def recommend_stream(req: RecommendRequest):
+    """
+    /api/recommend as server-sent events: the local ranking arrives immediately,
+    Gemini's summary and per-plan reasons follow as the model generates them.
+    """
+    snap = current_snapshot()
+    if not snap.plans:
+        raise HTTPException(
+            status_code=404,
+            detail="No plans in database. Trigger /api/scrape first.",
+        )
+    return StreamingResponse(
+        _iter_recommend_events(snap, req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Plan-Version": str(snap.version)},
+    )
 
-    return RecommendResponse(
-        overall_summary=result.get("overall_summary", ""),
-        top_pick=result.get("top_pick", ""),
-        ranked_plans=result.get("ranked_plans", []),
-        total_plans_analyzed=len(plans_data),
+
+_BATCH_CHUNK = 1000
+
+
+def _iter_batch_results(snap: PlanSnapshot, req: BatchRecommendRequest) -> Iterator[str]:
+    """Yield one NDJSON line per profile, scoring profiles against the snapshot a chunk at a time."""
+    matrix = plan_matrix(snap)
+    for start in range(0, len(req.profiles), _BATCH_CHUNK):
+        chunk = req.profiles[start:start + _BATCH_CHUNK]
+        rankings = rank_profiles(matrix, [p.model_dump(exclude={"use_ai"}) for p in chunk])
+        for offset, (profile, ranking) in enumerate(zip(chunk, rankings)):
+            result = _recommend_result(snap, ranking, bool(profile.use_ai), req.top_n, _deadline("recommend"))
+            yield json.dumps({
+                "index": start + offset,
+                "overall_summary": result.get("overall_summary", ""),
+                "top_pick": result.get("top_pick", ""),
+                "ranked_plans": result.get("ranked_plans", []),
+                "total_plans_analyzed": len(snap.plans),
+                "engine": result["engine"],
+                "prompt_tokens": result.get("prompt_tokens"),
+                "plan_version": snap.version,
+            }, default=str) + "\n"
+
+
+@app.post("/api/recommend/batch")
+def recommend_batch(req: BatchRecommendRequest):
+    """
+    Rank many user profiles against one plan snapshot and stream one NDJSON
+    result per profile (in request order). Gemini is opt-in per profile
+    (use_ai: true); everything else is ranked locally.
+    """
+    snap = current_snapshot()
+    if not snap.plans:
+        raise HTTPException(
+            status_code=404,
+            detail="No plans in database. Trigger /api/scrape first.",
+        )
+    return StreamingResponse(
+        _iter_batch_results(snap, req),
+        media_type="application/x-ndjson",
+        headers={"X-Plan-Version": str(snap.version)},
     )
 
 
+def _compare_plan_ids(snap: PlanSnapshot, names: List[str]) -> List[int]:
+    """
+    Ids of the plans named in `names` ("plan name" or "plan name (provider)").
+    A bare name shared by several providers is rejected rather than guessed.
+    """
+    by_label, by_name = {}, {}
+    for p in snap.plans:
+        by_label[f"{p.plan_name} ({p.provider})"] = p
+        by_name.setdefault(p.plan_name, []).append(p)
+    ids = []
+    for name in names:
+        matches = [by_label[name]] if name in by_label else by_name.get(name, [])
+        if len(matches) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{name}' is offered by {', '.join(p.provider for p in matches)}; "
+                       f"name it as 'plan name (provider)'",
+            )
+        ids.extend(p.id for p in matches)
+    return list(dict.fromkeys(ids))
+
+
 @app.post("/api/compare")
-def compare_plans_endpoint(req: CompareRequest, db: Session = Depends(get_db)):
-    """Compare selected plans side-by-side using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
-    selected = [p for p in plans_data if p["plan_name"] in req.plan_names]
+def compare_plans_endpoint(req: CompareRequest, response: Response):
+    """
+    Compare selected plans side-by-side: the table is computed locally from the
+    snapshot; Gemini (when enabled) only adds the verdict and per-plan notes.
+    """
+    deadline = _deadline("compare")
+    snap = _versioned(response, current_snapshot())
+    selected = _compare_plan_ids(snap, req.plan_names)
     if len(selected) < 2:
         raise HTTPException(status_code=400, detail="Need at least 2 matching plans to compare")
-    return compare_specific_plans(req.user_profile.model_dump(), selected)
+    ranking = rank_selected(snap, req.user_profile.model_dump(exclude={"use_ai"}), selected)
+    result = ranking.as_comparison()
+    if _use_ai(req.user_profile.use_ai):
+        plans = ranking.as_dicts(ranking.plans, ("id",) + ANALYSIS_FIELDS)
+        verdict = compare_specific_plans(dict(ranking.profile), plans, deadline)
+        if verdict is not None:
+            result = {**result, **verdict, "engine": "gemini"}
+    return result
 
 
 @app.post("/api/chat")
 def chat_endpoint(req: ChatRequest):
     """Ask follow-up questions to the AI insurance advisor."""
-    reply = chat_with_advisor(req.message, req.user_profile or {}, req.top_plans or [])
+    reply = chat_with_advisor(req.message, req.user_profile or {}, req.top_plans or [], _deadline("chat"))
     return {"reply": reply}
 
 
+async def _iter_chat_events(request: Request, req: ChatRequest) -> AsyncIterator[str]:
+    """
+    Server-sent events for /api/chat/stream:
+      token — {"text": …} deltas of the advisor's reply as Gemini generates them
+      done  — {"reply": …} the full reply
+      error — Gemini unavailable or past its deadline
+    When the client disconnects, the Gemini stream is stopped instead of being
+    read to the end.
+    """
+    cancel = threading.Event()
+    events = stream_chat(req.message, req.user_profile or {}, req.top_plans or [], _deadline("chat_stream"), cancel)
+    try:
+        while not await request.is_disconnected():
+            event = await run_in_threadpool(next, events, None)
+            if event is None:
+                return
+            yield _sse(*event)
+    finally:
+        cancel.set()
+        if not events.gi_running:       # else the pool thread inside next() stops at its next chunk
+            events.close()
+
+
+@app.post("/api/chat/stream")
+def chat_stream_endpoint(req: ChatRequest, request: Request):
+    """/api/chat as server-sent events: the advisor's reply arrives as it is generated."""
+    return StreamingResponse(
+        _iter_chat_events(request, req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/premium-estimate")
 def premium_estimate(req: PremiumEstimateRequest):
-    """Estimate premium range for given age, coverage, and term."""
-    return estimate_premium_range(req.age, req.sum_assured, req.policy_term)
+    """Estimate premium range for given age, coverage, and term (local model; Gemini tip when cached)."""
+    estimate = estimate_premium(req.age, req.sum_assured, req.policy_term)
+    if _use_ai(None):
+        tip = premium_tip(req.age, req.sum_assured, req.policy_term, _LLM_DEADLINES["tip"])
+        if tip:
+            estimate["tip"] = tip
+    return estimate
+
+
+@app.post("/api/premium-estimate/grid")
+def premium_estimate_grid(req: PremiumGridRequest):
+    """
+    Premium curves over every (age, sum assured, term) combination of the given
+    axes, per provider and market-wide (min / typical / max), read from the
+    precomputed premium grid. Arrays are indexed [age][sum_assured][term];
+    null where a provider offers no plan.
+    """
+    points = len(req.ages) * len(req.sum_assured) * len(req.policy_terms)
+    if points > _GRID_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Too many points ({points}); the limit is {_GRID_MAX_POINTS}")
+    snap = current_snapshot()
+    curves = premium_grid(snap).curves(req.ages, req.sum_assured, req.policy_terms, req.providers)
+    # Plain ints / None throughout, so skip jsonable_encoder's walk over every cell
+    return JSONResponse({
+        "plan_version": snap.version,
+        "ages": req.ages,
+        "sum_assured": req.sum_assured,
+        "policy_terms": req.policy_terms,
+        **curves,
+    }, headers={"X-Plan-Version": str(snap.version)})
 
 
 @app.post("/api/scrape")
@@ -253,237 +679,47 @@ def trigger_scrape(background_tasks: BackgroundTasks):
 
 
 @app.get("/api/stats")
-def stats(db: Session = Depends(get_db)):
+def stats(request: Request, response: Response):
     """Return DB statistics."""
-    total = db.query(InsurancePlan).count()
-    source_counts = (
-        db.query(InsurancePlan.source, func.count(InsurancePlan.id))
-        .group_by(InsurancePlan.source)
-        .all()
-    )
-    avg_csr = db.query(func.avg(InsurancePlan.claim_settlement_ratio)).scalar() or 0
-    return {
-        "total_plans": total,
-        "sources": {s: c for s, c in source_counts},
-        "avg_claim_settlement_ratio": round(float(avg_csr), 2),
-    }
+    snap = current_snapshot()
+    not_modified = _not_modified(request, response, snap, snap.digest, snap.last_modified)
+    if not_modified:
+        return not_modified
+    return {**snap.stats, "plan_version": snap.version}
 
 
-# ── Manual CRUD endpoints ─────────────────────────────────────────────────────
-
-@app.post("/api/plans", response_model=PlanOut, status_code=201)
-def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
-    """Manually add a new insurance plan."""
-    new_plan = InsurancePlan(**plan.model_dump(), source="manual")
-    db.add(new_plan)
-    db.commit()
-    db.refresh(new_plan)
-    return new_plan
-
-
-@app.put("/api/plans/{plan_id}", response_model=PlanOut)
-def update_plan(plan_id: int, updates: PlanUpdate, db: Session = Depends(get_db)):
-    """Update an existing insurance plan."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    for field, value in updates.model_dump(exclude_none=True).items():
-        setattr(plan, field, value)
-    db.commit()
-    db.refresh(plan)
-    return plan
-
-
-@app.delete("/api/plans/{plan_id}")
-def delete_plan(plan_id: int, db: Session = Depends(get_db)):
-    """Delete an insurance plan."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    db.delete(plan)
-    db.commit()
-    return {"message": f"Plan '{plan.plan_name}' deleted successfully"}
-
-
-@app.get("/api/plans/{plan_id}", response_model=PlanOut)
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
-    """Get a single plan by ID."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
-    if not plan:
-        raise HTTPException(status_code=404, detail="Plan not found")
-    return plan
-
-
-# ── Serve built React frontend (production) ───────────────────────────────────
-
-_frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
-if os.path.isdir(_frontend_dist):
-    app.mount("/", StaticFiles(directory=_frontend_dist, html=True), name="static")
-
-
-
-# ── Pydantic schemas ──────────────────────────────────────────────────────────
-
-class PlanOut(BaseModel):
-    id: int
-    plan_name: str
-    provider: str
-    source: str
-    sum_assured_min: float
-    sum_assured_max: float
-    premium_annual: float
-    policy_term_min: int
-    policy_term_max: int
-    age_min: int
-    age_max: int
-    claim_settlement_ratio: float
-    key_features: str
-    source_url: str
-
-    class Config:
-        from_attributes = True
-
-
-class PlanCreate(BaseModel):
-    plan_name: str = Field(..., min_length=2)
-    provider: str = Field(..., min_length=2)
-    sum_assured_min: float = Field(..., gt=0, description="Min sum assured in Lakhs")
-    sum_assured_max: float = Field(..., gt=0, description="Max sum assured in Lakhs")
-    premium_annual: float = Field(..., gt=0, description="Annual premium in INR")
-    policy_term_min: int = Field(..., ge=1, le=50)
-    policy_term_max: int = Field(..., ge=1, le=60)
-    age_min: int = Field(18, ge=1, le=99)
-    age_max: int = Field(65, ge=1, le=99)
-    claim_settlement_ratio: float = Field(..., ge=0, le=100)
-    key_features: str = Field("", description="Pipe-separated features e.g. 'Feature 1|Feature 2'")
-    source_url: str = Field("", description="Official plan URL")
-
-
-class PlanUpdate(BaseModel):
-    plan_name: Optional[str] = None
-    provider: Optional[str] = None
-    sum_assured_min: Optional[float] = None
-    sum_assured_max: Optional[float] = None
-    premium_annual: Optional[float] = None
-    policy_term_min: Optional[int] = None
-    policy_term_max: Optional[int] = None
-    age_min: Optional[int] = None
-    age_max: Optional[int] = None
-    claim_settlement_ratio: Optional[float] = None
-    key_features: Optional[str] = None
-    source_url: Optional[str] = None
-
-
-
-class RecommendRequest(BaseModel):
-    age: int = Field(..., ge=18, le=70, description="User's current age")
-    sum_assured: float = Field(..., gt=0, description="Desired sum assured in Lakhs")
-    premium_budget: float = Field(..., gt=0, description="Max annual premium in INR")
-    policy_term: int = Field(..., ge=5, le=50, description="Desired policy term in years")
-    min_csr: float = Field(95.0, ge=0, le=100, description="Minimum claim settlement ratio %")
-
-
-class RecommendResponse(BaseModel):
-    overall_summary: str
-    top_pick: str
-    ranked_plans: list
-    total_plans_analyzed: int
-
-
-# ── Endpoints ────────────────────────────────────────────────────────────────
-
-@app.get("/api/health")
-def health():
-    return {"status": "ok", "message": "Term Insurance Analyzer API is running"}
-
-
-@app.get("/api/plans", response_model=List[PlanOut])
-def get_plans(
-    source: Optional[str] = None,
-    min_csr: Optional[float] = None,
-    db: Session = Depends(get_db),
-):
-    """List all stored insurance plans with optional filters."""
-    query = db.query(InsurancePlan)
-    if source:
-        query = query.filter(InsurancePlan.source == source)
-    if min_csr is not None:
-        query = query.filter(InsurancePlan.claim_settlement_ratio >= min_csr)
-    plans = query.order_by(InsurancePlan.claim_settlement_ratio.desc()).all()
-    return plans
-
-
-@app.post("/api/recommend", response_model=RecommendResponse)
-def recommend(req: RecommendRequest, db: Session = Depends(get_db)):
-    """Analyze plans for the given user profile using Gemini AI."""
-    plans = db.query(InsurancePlan).all()
-    if not plans:
-        raise HTTPException(
-            status_code=404,
-            detail="No plans in database. Trigger /api/scrape first.",
-        )
-
-    # Serialize plans to dicts for the analyzer
-    plans_data = [
-        {
-            "plan_name": p.plan_name,
-            "provider": p.provider,
-            "source": p.source,
-            "sum_assured_min": p.sum_assured_min,
-            "sum_assured_max": p.sum_assured_max,
-            "premium_annual": p.premium_annual,
-            "policy_term_min": p.policy_term_min,
-            "policy_term_max": p.policy_term_max,
-            "age_min": p.age_min,
-            "age_max": p.age_max,
-            "claim_settlement_ratio": p.claim_settlement_ratio,
-            "key_features": p.key_features,
-        }
-        for p in plans
-    ]
-
-    result = analyze_plans(req.model_dump(), plans_data)
-
-    return RecommendResponse(
-        overall_summary=result.get("overall_summary", ""),
-        top_pick=result.get("top_pick", ""),
-        ranked_plans=result.get("ranked_plans", []),
-        total_plans_analyzed=len(plans_data),
-    )
-
-
-@app.post("/api/scrape")
-def trigger_scrape(background_tasks: BackgroundTasks):
-    """Manually trigger a fresh scrape in the background."""
-    background_tasks.add_task(run_scrape_job)
-    return {"message": "Scrape job started in background. Check /api/plans in ~30s."}
-
-
-@app.get("/api/stats")
-def stats(db: Session = Depends(get_db)):
-    """Return DB statistics."""
-    total = db.query(InsurancePlan).count()
-    sources = (
-        db.query(InsurancePlan.source, db.query(InsurancePlan).filter(
-            InsurancePlan.source == InsurancePlan.source).count())
-        .distinct()
-        .all()
-    )
+@app.get("/api/metrics")
+def metrics():
+    """In-process counters (recommendation cache hit/miss, prompt tokens, model health, …)."""
     return {
-        "total_plans": total,
-        "sources": [s[0] for s in sources],
+        "recommend_cache": recommendation_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_single_flight": single_flight_stats(),
+        "llm_router": router_stats(),
+        "llm_prompt": prompt_stats(),
     }
 
 
 # ── Manual CRUD endpoints ─────────────────────────────────────────────────────
 
+def _commit_or_conflict(db: Session):
+    """Commit, turning a (plan_name, provider) unique-key clash into a 409."""
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A plan with this name and provider already exists")
+
+
 @app.post("/api/plans", response_model=PlanOut, status_code=201)
 def create_plan(plan: PlanCreate, db: Session = Depends(get_db)):
     """Manually add a new insurance plan."""
     new_plan = InsurancePlan(**plan.model_dump(), source="manual")
     db.add(new_plan)
-    db.commit()
+    version = bump_catalog_version(db)
+    _commit_or_conflict(db)
     db.refresh(new_plan)
+    apply_plan_change(db, new_plan.id, version)
     return new_plan
 
 
@@ -495,8 +731,11 @@ def update_plan(plan_id: int, updates: PlanUpdate, db: Session = Depends(get_db)
         raise HTTPException(status_code=404, detail="Plan not found")
     for field, value in updates.model_dump(exclude_none=True).items():
         setattr(plan, field, value)
-    db.commit()
+    plan.scraped_at = datetime.utcnow()     # last-updated time, drives Last-Modified
+    version = bump_catalog_version(db)
+    _commit_or_conflict(db)
     db.refresh(plan)
+    apply_plan_change(db, plan.id, version)
     return plan
 
 
@@ -507,16 +746,22 @@ def delete_plan(plan_id: int, db: Session = Depends(get_db)):
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     db.delete(plan)
+    version = bump_catalog_version(db)
     db.commit()
+    apply_plan_change(db, plan_id, version)
     return {"message": f"Plan '{plan.plan_name}' deleted successfully"}
 
 
 @app.get("/api/plans/{plan_id}", response_model=PlanOut)
-def get_plan(plan_id: int, db: Session = Depends(get_db)):
+def get_plan(plan_id: int, request: Request, response: Response):
     """Get a single plan by ID."""
-    plan = db.query(InsurancePlan).filter(InsurancePlan.id == plan_id).first()
+    snap = current_snapshot()
+    plan = snap.by_id.get(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
+    not_modified = _not_modified(request, response, snap, record_digest(plan), plan.scraped_at)
+    if not_modified:
+        return not_modified
     return plan
 
 
@@ -525,8 +770,3 @@ def get_plan(plan_id: int, db: Session = Depends(get_db)):
 _frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
 if os.path.isdir(_frontend_dist):
     app.mount("/", StaticFiles(directory=_frontend_dist, html=True), name="static")
-
-
-_frontend_dist = os.path.join(os.path.dirname(__file__), "..", "frontend", "dist")
-if os.path.isdir(_frontend_dist):
-    app.mount("/", StaticFiles(directory=_frontend_dist, html=True), name="static")
@@ -0,0 +1,378 @@
+"""
+Routing layer for Gemini calls: per-model health, quota cooldowns, a circuit
+breaker and a latency EWMA, shared by every request in the process.
+
+Every call goes to the best currently healthy model. Preference order
+(_MODEL_FALLBACKS) is the tie-breaker, and a slow model loses to a faster
+one further down the list. Failures are classified:
+  - quota (429 / resource exhausted) — cool down for the retry delay the API
+    asks for, else LLM_QUOTA_COOLDOWN seconds
+  - not found (404) — model disabled for LLM_NOT_FOUND_COOLDOWN seconds
+  - unavailable (5xx / timeout) — counted; LLM_BREAKER_THRESHOLD in a row
+    opens the breaker for LLM_BREAKER_COOLDOWN seconds, doubling each time it
+    re-trips, up to 10 minutes
+  - anything else (bad key, bad request, unparseable reply) — raised as is,
+    since another model would not do better
+Tripped models are skipped until their cooldown expires. After that, one
+trial call decides whether they close again (half-open).
+
+Calls carry an optional deadline (time.monotonic() value) that becomes the
+request timeout of every attempt. When the first model has not answered by
+the LLM_HEDGE_PERCENTILE of its recent latencies for that kind of call
+(recommend, chat, …), a hedged request goes to the next candidate and the
+first reply wins; the loser runs to completion in the background, only to
+update its health.
+
+Streams record their time to first token per call label. A stream the caller
+closes early (client gone) is counted as cancelled and stops reading from the
+model instead of generating the rest of the reply.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from settings import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+_EWMA_ALPHA = 0.3
+_PRIOR_LATENCY = 2.0            # seconds assumed for a model that has not answered yet (until one has)
+_MAX_BREAKER_COOLDOWN = 600.0
+_LATENCY_SAMPLES = 100          # recent latencies kept per (model, call label) for the hedge percentile
+
+
+class NoHealthyModel(RuntimeError):
+    """Every model is cooling down, disabled or failed for this call."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The caller's deadline passed before any model answered."""
+
+
+def classify_error(error: Exception) -> str:
+    """'quota', 'not_found', 'unavailable' or 'fatal'."""
+    if isinstance(error, ValueError):
+        return "fatal"                  # unparseable reply — another model is no more likely to comply
+    code = getattr(error, "code", None)  # google.api_core exceptions carry the HTTP status
+    if isinstance(code, int):
+        if code == 429:
+            return "quota"
+        if code == 404:
+            return "not_found"
+        if code >= 500:
+            return "unavailable"
+    text = str(error).lower()
+    if "429" in text or "quota" in text or "resource exhausted" in text or "resource_exhausted" in text:
+        return "quota"
+    if "404" in text or "not found" in text:
+        return "not_found"
+    if isinstance(error, TimeoutError) or any(
+        s in text for s in ("500", "502", "503", "504", "unavailable", "deadline", "timed out", "timeout")
+    ):
+        return "unavailable"
+    return "fatal"
+
+
+_RETRY_DELAY = re.compile(r"retry(?:_delay)?\D{0,20}?(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+def _retry_delay(error: Exception) -> Optional[float]:
+    """Retry delay the API asked for ("retry_delay { seconds: 37 }", "retry in 12.5s"), if any."""
+    match = _RETRY_DELAY.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+@dataclass
+class ModelHealth:
+    name: str
+    state: str = "closed"              # closed | open | half_open
+    cooldown_until: float = 0.0
+    consecutive_failures: int = 0
+    trips: int = 0
+    latency_ewma: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+    trial_in_flight: bool = False      # half_open admits one trial call at a time
+
+    def available(self, now: float) -> bool:
+        if self.state == "open" and now >= self.cooldown_until:
+            self.state = "half_open"
+        if self.state == "half_open":
+            return not self.trial_in_flight
+        return self.state != "open"
+
+    def as_dict(self, now: float) -> Dict:
+        return {
+            "state": self.state,
+            "cooldown_remaining_s": round(max(0.0, self.cooldown_until - now), 1) if self.state == "open" else 0,
+            "latency_ewma_ms": round(self.latency_ewma * 1000) if self.latency_ewma is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "trial_in_flight": self.trial_in_flight,
+        }
+
+
+class ModelRouter:
+    def __init__(self, names: Sequence[str], factory: Callable[[str], Any]):
+        self.names = list(names)
+        self._factory = factory
+        self._models: Dict[str, Any] = {}
+        self._health = {name: ModelHealth(name) for name in self.names}
+        self._latencies: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=env_int("LLM_MAX_CONCURRENCY", 32), thread_name_prefix="llm"
+        )
+        self._first_token: Dict[str, deque] = {}
+        self._counts = {"hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0, "streams_cancelled": 0}
+        self.preference_weight = env_float("LLM_ROUTER_PREFERENCE_WEIGHT", 0.5)
+        self.hedge_percentile = env_float("LLM_HEDGE_PERCENTILE", 95)
+        self.hedge_min_samples = env_int("LLM_HEDGE_MIN_SAMPLES", 20)
+        self.hedge_default_delay = env_float("LLM_HEDGE_DEFAULT_DELAY", 6)
+
+    def model(self, name: str):
+        """
+        The (cached) client object for `name`. Built outside the lock: the first
+        one imports and configures the SDK, which would stall every health and
+        stats call meanwhile. Concurrent first calls may build twice; one wins.
+        """
+        client = self._models.get(name)
+        if client is None:
+            client = self._factory(name)
+            with self._lock:
+                client = self._models.setdefault(name, client)
+        return client
+
+    def candidates(self) -> List[str]:
+        """
+        Healthy models, best first: latency EWMA scaled by a penalty for lower
+        preference. Models not measured yet count as the slowest measured one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            prior = max((h.latency_ewma for h in self._health.values() if h.latency_ewma is not None),
+                        default=_PRIOR_LATENCY)
+            ranked = [
+                ((h.latency_ewma if h.latency_ewma is not None else prior) * (1 + self.preference_weight * i), i, name)
+                for i, (name, h) in enumerate(self._health.items())
+                if h.available(now)
+            ]
+        return [name for _, _, name in sorted(ranked)]
+
+    def hedge_delay(self, name: str, label: str) -> Optional[float]:
+        """
+        Seconds to wait on `name` before hedging a `label` call: the configured
+        percentile of its recent latencies, or a default until enough samples
+        exist. None when hedging is disabled (LLM_HEDGE_PERCENTILE=0).
+        """
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get((name, label), ()))
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))]
+
+    def record_success(self, name: str, latency: float, label: str = "default"):
+        with self._lock:
+            h = self._health[name]
+            h.latency_ewma = latency if h.latency_ewma is None else (
+                _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * h.latency_ewma
+            )
+            self._latencies.setdefault((name, label), deque(maxlen=_LATENCY_SAMPLES)).append(latency)
+            h.successes += 1
+            h.consecutive_failures = 0
+            h.trial_in_flight = False
+            if h.state != "closed":
+                logger.info(f"Model {name} recovered")
+            h.state, h.trips = "closed", 0
+
+    def record_failure(self, name: str, error: Exception) -> str:
+        """Update `name`'s health after `error`; returns the error class."""
+        kind = classify_error(error)
+        now = time.monotonic()
+        with self._lock:
+            h = self._health[name]
+            h.failures += 1
+            h.trial_in_flight = False
+            h.last_error = f"{kind}: {str(error)[:200]}"
+            if kind == "fatal":
+                return kind
+            h.consecutive_failures += 1
+            if kind == "quota":
+                cooldown = _retry_delay(error) or env_float("LLM_QUOTA_COOLDOWN", 60)
+            elif kind == "not_found":
+                cooldown = env_float("LLM_NOT_FOUND_COOLDOWN", 3600)
+            elif h.state == "half_open" or h.consecutive_failures >= env_float("LLM_BREAKER_THRESHOLD", 3):
+                h.trips += 1
+                cooldown = min(env_float("LLM_BREAKER_COOLDOWN", 30) * 2 ** (h.trips - 1), _MAX_BREAKER_COOLDOWN)
+            else:
+                return kind
+            h.state, h.cooldown_until = "open", now + cooldown
+        logger.warning(f"Model {name} unavailable for {cooldown:.0f}s ({kind})")
+        return kind
+
+    def _acquire(self, name: str) -> bool:
+        """
+        Claim `name` for one call. False when it is open, or half-open with its
+        trial call already in flight; otherwise a half-open model is marked as
+        running its trial until that call's outcome is recorded.
+        """
+        with self._lock:
+            h = self._health[name]
+            if not h.available(time.monotonic()):
+                return False
+            if h.state == "half_open":
+                h.trial_in_flight = True
+            return True
+
+    def _release(self, name: str):
+        """End `name`'s half-open trial without recording an outcome."""
+        with self._lock:
+            self._health[name].trial_in_flight = False
+
+    def _fail(self, name: str, error: Exception, deadline: Optional[float]) -> str:
+        """record_failure, except for a timeout at the caller's own deadline; returns the error class."""
+        kind = classify_error(error)
+        # A timeout at the caller's own deadline says more about the budget than the model
+        if deadline is not None and time.monotonic() >= deadline and kind == "unavailable":
+            self._release(name)
+            return kind
+        return self.record_failure(name, error)
+
+    def _attempt(self, name: str, fn: Callable[[Any, Optional[float]], Any],
+                 deadline: Optional[float], label: str) -> Any:
+        """One call of fn on `name` (in a pool thread), recording its outcome."""
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        started = time.monotonic()
+        try:
+            result = fn(self.model(name), timeout)
+        except Exception as e:
+            self._fail(name, e, deadline)
+            raise
+        self.record_success(name, time.monotonic() - started, label)
+        return result
+
+    def call(self, fn: Callable[[Any, Optional[float]], Any], deadline: Optional[float] = None,
+             label: str = "default") -> Tuple[str, Any]:
+        """
+        fn(model, timeout) on the best healthy model, where timeout is the
+        time left until `deadline` (None = no deadline). Moves down the
+        candidates on quota / not-found / unavailable errors and hedges a slow
+        first attempt. Returns (model name, result); raises DeadlineExceeded
+        or NoHealthyModel when no model answered in time.
+        """
+        queue = iter(self.candidates())
+        pending: Dict[Any, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> Optional[str]:
+            for name in queue:
+                if self._acquire(name):
+                    pending[self._pool.submit(self._attempt, name, fn, deadline, label)] = name
+                    return name
+            return None
+
+        first = launch()
+        delay = self.hedge_delay(first, label) if first is not None else None
+        hedge_at = None if delay is None else time.monotonic() + delay
+        while pending:
+            wake = min((t for t in (deadline, hedge_at) if t is not None), default=None)
+            done, _ = wait(list(pending), timeout=None if wake is None else max(0.0, wake - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if classify_error(e) == "fatal":
+                        raise
+                    last_error = e
+                    logger.warning(f"Model {name} failed ({e}). Trying next model...")
+                    continue
+                if name != first:
+                    with self._lock:
+                        self._counts["hedge_wins"] += 1
+                return name, result
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                with self._lock:
+                    self._counts["deadline_exceeded"] += 1
+                raise DeadlineExceeded(f"No Gemini reply within the deadline (waiting on {', '.join(pending.values())})")
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if launch() is not None:
+                    with self._lock:
+                        self._counts["hedged"] += 1
+                    logger.info(f"Model {first} slower than {delay:.1f}s ({label}); hedging")
+            if not pending:
+                launch()
+        raise NoHealthyModel(f"No healthy Gemini model available (last error: {last_error})")
+
+    def stream(self, fn: Callable[[Any, Optional[float]], Iterator], deadline: Optional[float] = None,
+               label: str = "default") -> Iterator[Tuple[str, Any]]:
+        """
+        Yield (model name, item) for each item of fn(model, timeout) on the
+        best healthy model. A model that fails before its first item is
+        replaced by the next candidate; once anything has been yielded, errors
+        propagate. Streams are not hedged — only the deadline applies.
+        """
+        last_error: Optional[Exception] = None
+        stream_started = time.monotonic()
+        for name in self.candidates():
+            started, yielded = time.monotonic(), False
+            if deadline is not None and started >= deadline:
+                with self._lock:
+                    self._counts["deadline_exceeded"] += 1
+                raise DeadlineExceeded("No Gemini reply within the deadline")
+            if not self._acquire(name):
+                continue
+            try:
+                for item in fn(self.model(name), None if deadline is None else deadline - started):
+                    if not yielded:
+                        self._record_first_token(label, time.monotonic() - stream_started)
+                    yielded = True
+                    yield name, item
+            except GeneratorExit:
+                self._release(name)
+                with self._lock:
+                    self._counts["streams_cancelled"] += 1
+                raise
+            except Exception as e:
+                if self._fail(name, e, deadline) == "fatal" or yielded:
+                    raise
+                last_error = e
+                logger.warning(f"Streaming with {name} failed ({e}). Trying next model...")
+                continue
+            self.record_success(name, time.monotonic() - started, label)
+            return
+        raise NoHealthyModel(f"No healthy Gemini model available (last error: {last_error})")
+
+    def _record_first_token(self, label: str, seconds: float):
+        with self._lock:
+            self._first_token.setdefault(label, deque(maxlen=_LATENCY_SAMPLES)).append(seconds)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            first_token = {label: sorted(samples) for label, samples in self._first_token.items()}
+            return {
+                **self._counts,
+                "time_to_first_token_ms": {
+                    label: {
+                        "samples": len(samples),
+                        "p50": round(samples[len(samples) // 2] * 1000),
+                        "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000),
+                    }
+                    for label, samples in first_token.items()
+                },
+                "models": {name: h.as_dict(now) for name, h in self._health.items()},
+            }
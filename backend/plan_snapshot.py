@@ -0,0 +1,222 @@
+"""
+Immutable, versioned in-process snapshot of the insurance_plans table.
+
+Read endpoints serve from `current_snapshot()` instead of querying the DB.
+The snapshot is only replaced as a whole:
+  - `refresh_snapshot()` reloads the table — called once a scrape job has applied
+    every source, so readers never see a half-applied scrape;
+  - `apply_plan_change()` patches a single plan — called by the manual CRUD endpoints;
+  - `current_snapshot()` reloads the table when the catalog_version row no longer
+    matches the one the snapshot was built from, i.e. another worker process
+    has written to the catalog since.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session, selectinload
+
+from database import SessionLocal, InsurancePlan, catalog_version, engine
+
+logger = logging.getLogger(__name__)
+
+# Fields handed to the Gemini analyzer for /api/recommend
+ANALYSIS_FIELDS = (
+    "plan_name", "provider", "source",
+    "sum_assured_min", "sum_assured_max", "premium_annual",
+    "policy_term_min", "policy_term_max", "age_min", "age_max",
+    "claim_settlement_ratio", "key_features",
+)
+
+
+@dataclass(frozen=True)
+class PlanRecord:
+    id: int
+    plan_name: str
+    provider: str
+    source: str
+    sum_assured_min: float
+    sum_assured_max: float
+    premium_annual: float
+    policy_term_min: int
+    policy_term_max: int
+    age_min: int
+    age_max: int
+    claim_settlement_ratio: float
+    key_features: str
+    source_url: str
+    scraped_at: Optional[datetime]
+    premium_curve: Tuple[Tuple[int, float], ...] = ()   # (age, annual premium), ascending age
+
+    @classmethod
+    def from_row(cls, row: InsurancePlan) -> "PlanRecord":
+        values = {f.name: getattr(row, f.name) for f in fields(cls) if f.name != "premium_curve"}
+        return cls(**values, premium_curve=tuple((pt.age, pt.premium) for pt in row.premium_curve))
+
+    def as_dict(self, keys: Tuple[str, ...] = ANALYSIS_FIELDS) -> Dict:
+        """Fresh (mutable) dict of the given fields."""
+        return {k: getattr(self, k) for k in keys}
+
+
+@dataclass(frozen=True)
+class PlanSnapshot:
+    version: int                           # local publication counter (X-Plan-Version)
+    catalog_version: int                   # catalog_version row the plans were read at
+    digest: str                            # content hash of every plan row
+    built_at: datetime
+    last_modified: Optional[datetime]      # max(scraped_at), bumped to publish time on deletes
+    plans: Tuple[PlanRecord, ...]          # sorted by claim_settlement_ratio desc, id asc
+    by_id: Mapping[int, PlanRecord]
+    stats: Mapping[str, object]
+
+    def keyset_start(self, claim_settlement_ratio: float, plan_id: int) -> int:
+        """Index of the first plan ordered after the (claim_settlement_ratio, id) cursor."""
+        return bisect.bisect_right(self.plans, (-claim_settlement_ratio, plan_id), key=_sort_key)
+
+
+def _sort_key(p: PlanRecord):
+    return (-(p.claim_settlement_ratio or 0), p.id)
+
+
+def _digest(plans: Tuple[PlanRecord, ...]) -> str:
+    h = hashlib.sha1()
+    for p in plans:
+        h.update(repr(tuple(getattr(p, f.name) for f in fields(PlanRecord))).encode())
+    return h.hexdigest()
+
+
+def record_digest(plan: PlanRecord) -> str:
+    """Content hash of a single plan (used as its ETag)."""
+    return _digest((plan,))
+
+
+def _stats(plans: Tuple[PlanRecord, ...]) -> Dict:
+    sources: Dict[str, int] = {}
+    for p in plans:
+        sources[p.source] = sources.get(p.source, 0) + 1
+    avg_csr = sum(p.claim_settlement_ratio or 0 for p in plans) / len(plans) if plans else 0
+    return {
+        "total_plans": len(plans),
+        "sources": sources,
+        "avg_claim_settlement_ratio": round(float(avg_csr), 2),
+    }
+
+
+_lock = threading.Lock()
+_current: Optional[PlanSnapshot] = None
+
+
+def _publish(records, stored_version: int) -> PlanSnapshot:
+    """Build a snapshot from `records` (read at catalog `stored_version`) and swap it in. Caller holds _lock."""
+    global _current
+    plans = tuple(sorted(records, key=_sort_key))
+    digest = _digest(plans)
+    if _current is not None and _current.digest == digest:
+        if _current.catalog_version != stored_version:
+            _current = replace(_current, catalog_version=stored_version)
+        return _current
+    now = datetime.utcnow()
+    last_modified = max((p.scraped_at for p in plans if p.scraped_at), default=None)
+    if _current is not None and len(plans) < len(_current.plans):
+        # A removed plan leaves no scraped_at behind; date the change by its publication
+        last_modified = now
+    _current = PlanSnapshot(
+        version=(_current.version + 1) if _current else 1,
+        catalog_version=stored_version,
+        digest=digest,
+        built_at=now,
+        last_modified=last_modified,
+        plans=plans,
+        by_id=MappingProxyType({p.id: p for p in plans}),
+        stats=MappingProxyType(_stats(plans)),
+    )
+    logger.info(f"Plan snapshot v{_current.version}: {len(plans)} plans")
+    return _current
+
+
+def _reload(db: Session) -> PlanSnapshot:
+    """Read every plan and publish them. Caller holds _lock."""
+    # Version first: a write landing in between makes the snapshot look stale, never current
+    stored_version = catalog_version(db)
+    rows = (
+        db.query(InsurancePlan)
+        .options(selectinload(InsurancePlan.premium_curve))
+        .populate_existing()
+        .all()
+    )
+    return _publish([PlanRecord.from_row(row) for row in rows], stored_version)
+
+
+def _reload_with_own_session() -> PlanSnapshot:
+    db = SessionLocal()
+    try:
+        return _reload(db)
+    finally:
+        db.close()
+
+
+def _stored_version() -> int:
+    """
+    catalog_version for the per-request freshness check, read on a raw DBAPI
+    connection (about 30µs on SQLite vs. ~300µs through a SQLAlchemy Connection).
+    """
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def refresh_snapshot() -> PlanSnapshot:
+    """Reload every plan from the DB and publish a new snapshot if anything changed."""
+    with _lock:
+        return _reload_with_own_session()
+
+
+def apply_plan_change(db: Session, plan_id: int, version: int) -> PlanSnapshot:
+    """
+    Publish a committed CRUD write to plan `plan_id` that moved the catalog to
+    `version`. The row is re-read under the lock through the caller's session
+    (so waiting writers don't each hold a second pooled connection), and
+    concurrent writes publish in commit order. The plan is patched in only when
+    the snapshot is exactly one write behind; otherwise the table is reloaded.
+    """
+    with _lock:
+        if _current is not None and _current.catalog_version >= version:
+            return _current
+        if _current is None or _current.catalog_version != version - 1:
+            return _reload(db)
+        row = (
+            db.query(InsurancePlan)
+            .options(selectinload(InsurancePlan.premium_curve))
+            .populate_existing()
+            .filter(InsurancePlan.id == plan_id)
+            .first()
+        )
+        records = [p for p in _current.plans if p.id != plan_id]
+        if row is not None:
+            records.append(PlanRecord.from_row(row))
+        return _publish(records, version)
+
+
+def current_snapshot() -> PlanSnapshot:
+    """
+    The latest published snapshot, reloaded first when the stored catalog
+    version shows a write this process has not published (or on first use).
+    """
+    snap = _current
+    if snap is not None and snap.catalog_version == _stored_version():
+        return snap
+    with _lock:
+        if _current is not None and _current.catalog_version == _stored_version():
+            return _current
+        return _reload_with_own_session()
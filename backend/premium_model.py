@@ -0,0 +1,277 @@
+"""
+Deterministic premium estimate for /api/premium-estimate — no LLM call.
+
+Anchored on the reference quotes the scrapers already use
+(scraper/reference_data.py):
+  - PREMIUM_MAP — provider premiums for ₹1 Cr cover at age 30, which give the
+    market band (cheapest, median, dearest)
+  - AGE_PREMIUM_MAP — HDFC's premium at ages 20–50, which gives how premiums
+    grow with age
+
+    premium(age, SA, term) = reference × age_factor(age) × sa_factor(SA) × term_factor(term)
+
+age_factor interpolates the HDFC curve log-linearly (premiums grow roughly
+exponentially with age) and extrapolates along its end segments.
+term_factor reuses that growth rate: a level premium pays for the average
+risk over the term, so n years cost mean(e^(b·k), k < n) relative to the
+30-year reference term. sa_factor scales with SA^0.85, since per-lakh rates
+fall as cover grows (high sum assured rebates).
+
+plan_premiums() gives one plan's premium at each entry age for the ranking
+engine: the plan's own scraped age curve where a source publishes one
+(log-linear between points, end segments extended), else its premium_annual
+(an age-30 quote) scaled by age_factor.
+
+PremiumGrid precomputes the same model per provider in the current plan
+snapshot, over age 18–70 × sum assured buckets × term buckets. Each
+provider's reference premium comes from its plans' scraped premiums. Cells
+are NaN where no plan of the provider offers that age / cover / term. The
+grid is rebuilt once per snapshot version, and arbitrary points are read
+back with vectorized trilinear interpolation in log space.
+"""
+import bisect
+import math
+import statistics
+import threading
+import warnings
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from plan_snapshot import PlanRecord, PlanSnapshot
+from scraper.reference_data import AGE_PREMIUM_MAP, PREMIUM_MAP
+
+_REF_AGE = 30
+_REF_SA = 100.0          # ₹ Lakhs (₹1 Cr)
+_REF_TERM = 30           # years
+_SA_ELASTICITY = 0.85
+
+
+def _slope(xs, ys) -> float:
+    """Least-squares slope of ys over xs."""
+    mx, my = statistics.fmean(xs), statistics.fmean(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+
+def _log_linear(xs: np.ndarray, log_ys: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """Vectorized _log_factor: piecewise-linear in log space, end segments extended (needs ≥ 2 knots)."""
+    i = np.clip(np.searchsorted(xs, x, side="right"), 1, len(xs) - 1)
+    return log_ys[i - 1] + (log_ys[i] - log_ys[i - 1]) * (x - xs[i - 1]) / (xs[i] - xs[i - 1])
+
+
+@dataclass(frozen=True)
+class PremiumModel:
+    ages: Tuple[float, ...]            # age curve knots
+    log_factors: Tuple[float, ...]     # ln(premium at knot / premium at _REF_AGE)
+    growth: float                      # per-year log growth of the premium with age
+    low: float                         # reference band: ₹1 Cr, age 30, 30-year term
+    typical: float
+    high: float
+
+    @classmethod
+    def from_reference(cls, age_map: Mapping[int, float] = AGE_PREMIUM_MAP,
+                       reference_premiums: Iterable[float] = PREMIUM_MAP.values()) -> "PremiumModel":
+        ages = sorted(age_map)
+        logs = [math.log(age_map[a]) for a in ages]
+        curve = cls(tuple(ages), tuple(logs), _slope(ages, logs), 0, 0, 0)
+        ref = curve._log_factor(_REF_AGE)
+        premiums = sorted(reference_premiums)
+        return cls(
+            ages=tuple(ages),
+            log_factors=tuple(l - ref for l in logs),
+            growth=curve.growth,
+            low=premiums[0],
+            typical=statistics.median(premiums),
+            high=premiums[-1],
+        )
+
+    def _log_factor(self, age: float) -> float:
+        """Piecewise-linear in log space; end segments extended beyond the knots."""
+        xs, ys = self.ages, self.log_factors
+        i = min(max(bisect.bisect_right(xs, age), 1), len(xs) - 1)
+        x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+        return y0 + (y1 - y0) * (age - x0) / (x1 - x0)
+
+    def age_factor(self, age: float) -> float:
+        return math.exp(self._log_factor(age))
+
+    def plan_premiums(self, plan: PlanRecord, ages: np.ndarray) -> np.ndarray:
+        """`plan`'s annual premium at each of `ages` (NaN when it publishes none)."""
+        curve = plan.premium_curve
+        if len(curve) >= 2:
+            knots = np.array(curve, dtype=np.float64)
+            return np.exp(_log_linear(knots[:, 0], np.log(knots[:, 1]), ages))
+        factors = np.exp(_log_linear(np.array(self.ages), np.array(self.log_factors), ages))
+        if curve:
+            (age, premium), = curve
+            return premium * factors / self.age_factor(age)
+        if plan.premium_annual and plan.premium_annual > 0:
+            return plan.premium_annual * factors
+        return np.full(len(ages), np.nan)
+
+    def _level(self, term: float) -> float:
+        b = self.growth * term
+        return math.expm1(b) / b if abs(b) > 1e-9 else 1.0
+
+    def term_factor(self, term: float) -> float:
+        return self._level(term) / self._level(_REF_TERM)
+
+    @staticmethod
+    def sa_factor(sum_assured: float) -> float:
+        return (sum_assured / _REF_SA) ** _SA_ELASTICITY
+
+    def estimate(self, age: int, sum_assured: float, policy_term: int) -> Dict:
+        """Same shape as the former Gemini estimate, plus engine="local"."""
+        a, s, t = self.age_factor(age), self.sa_factor(sum_assured), self.term_factor(policy_term)
+        f = a * s * t
+        return {
+            "min_premium": int(round(self.low * f)),
+            "max_premium": int(round(self.high * f)),
+            "typical_premium": int(round(self.typical * f)),
+            "factors": [
+                f"Age {age} — {'low' if age < 35 else 'moderate' if age < 50 else 'higher'} risk "
+                f"({a:.2f}× the age-{_REF_AGE} rate)",
+                f"Coverage ₹{sum_assured:g}L ({s:.2f}× a ₹1 Cr premium)",
+                f"{policy_term} year term — cover to age {age + policy_term} ({t:.2f}× a {_REF_TERM}-year term)",
+            ],
+            "tip": self.tip(age, policy_term),
+            "engine": "local",
+        }
+
+    def tip(self, age: int, policy_term: int) -> str:
+        """A rule-based tip computed from the model itself."""
+        cover_to = age + policy_term
+        if cover_to > 65 and policy_term > 10:
+            shorter = 60 - age if age < 50 else 10
+            saving = 1 - self.term_factor(shorter) / self.term_factor(policy_term)
+            return (f"Cover to age {cover_to} is costly — ending it at {age + shorter}, once your "
+                    f"dependants are settled, would cut the premium by about {saving:.0%}.")
+        if age < 45:
+            decade = math.exp(self.growth * 10) - 1
+            return (f"Premiums rise about {decade:.0%} with every decade of age — locking in cover "
+                    f"now is cheaper than waiting.")
+        return "Buying at a younger age and maintaining a healthy lifestyle significantly reduces your premium."
+
+
+premium_model = PremiumModel.from_reference()
+
+
+def estimate_premium(age: int, sum_assured: float, policy_term: int) -> Dict:
+    return premium_model.estimate(age, sum_assured, policy_term)
+
+
+# ── Premium grid ─────────────────────────────────────────────────────────────
+GRID_AGES = np.arange(18, 71, dtype=np.float64)
+GRID_SUM_ASSURED = np.array([25, 50, 75, 100, 150, 200, 300, 500, 1000, 2000], dtype=np.float64)   # ₹ Lakhs
+GRID_TERMS = np.arange(5, 55, 5, dtype=np.float64)
+
+
+def _axis(grid: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Lower knot index and weight of the upper knot for each x (clamped to the grid)."""
+    i = np.clip(np.searchsorted(grid, x, side="right") - 1, 0, len(grid) - 2)
+    w = np.clip((x - grid[i]) / (grid[i + 1] - grid[i]), 0.0, 1.0)
+    return i, w
+
+
+@dataclass(frozen=True)
+class PremiumGrid:
+    version: int
+    providers: Tuple[str, ...]
+    log_premium: np.ndarray    # float32 (providers, ages, sum assured, terms); NaN = not offered
+
+    @classmethod
+    def from_snapshot(cls, snap: PlanSnapshot, model: PremiumModel = premium_model) -> "PremiumGrid":
+        by_provider: Dict[str, list] = {}
+        for p in snap.plans:
+            by_provider.setdefault(p.provider, []).append(p)
+        providers = tuple(sorted(by_provider))
+
+        # Scraped premiums are quotes at age 30 for ₹1 Cr (or the nearest cover the plan offers)
+        ref = np.full(len(providers), np.nan)
+        for k, name in enumerate(providers):
+            quotes = [
+                p.premium_annual / model.sa_factor(min(max(_REF_SA, p.sum_assured_min or 0), p.sum_assured_max or _REF_SA))
+                for p in by_provider[name] if p.premium_annual and p.premium_annual > 0
+            ]
+            if quotes:
+                ref[k] = statistics.median(quotes)
+
+        age = np.array([math.log(model.age_factor(a)) for a in GRID_AGES])
+        cover = np.log([model.sa_factor(sa) for sa in GRID_SUM_ASSURED])
+        term = np.log([model.term_factor(t) for t in GRID_TERMS])
+        grid = (np.log(ref)[:, None, None, None] + age[None, :, None, None]
+                + cover[None, None, :, None] + term[None, None, None, :])
+
+        offered = np.zeros(grid.shape, dtype=bool)
+        for k, name in enumerate(providers):
+            for p in by_provider[name]:
+                offered[k] |= (
+                    ((GRID_AGES >= (p.age_min or 0)) & (GRID_AGES <= (p.age_max or 99)))[:, None, None]
+                    & ((GRID_SUM_ASSURED >= (p.sum_assured_min or 0)) & (GRID_SUM_ASSURED <= (p.sum_assured_max or np.inf)))[None, :, None]
+                    & ((GRID_TERMS >= (p.policy_term_min or 0)) & (GRID_TERMS <= (p.policy_term_max or 99)))[None, None, :]
+                )
+        grid[~offered] = np.nan
+        return cls(version=snap.version, providers=providers, log_premium=grid.astype(np.float32))
+
+    def lookup(self, ages: Sequence[float], sum_assured: Sequence[float], terms: Sequence[float]) -> np.ndarray:
+        """
+        Annual premiums (providers × points) at the given (age, sum assured,
+        term) points. NaN where a provider does not offer a neighbouring grid cell.
+        """
+        (ai, aw), (si, sw), (ti, tw) = (
+            _axis(GRID_AGES, np.asarray(ages, dtype=np.float64)),
+            _axis(np.log(GRID_SUM_ASSURED), np.log(np.asarray(sum_assured, dtype=np.float64))),
+            _axis(GRID_TERMS, np.asarray(terms, dtype=np.float64)),
+        )
+        out = np.zeros((len(self.providers), len(ai)))
+        for da, wa in ((0, 1 - aw), (1, aw)):
+            for ds, ws in ((0, 1 - sw), (1, sw)):
+                for dt, wt in ((0, 1 - tw), (1, tw)):
+                    w = wa * ws * wt
+                    corner = self.log_premium[:, ai + da, si + ds, ti + dt]
+                    out += np.where(w > 0, corner * w, 0.0)     # a NaN corner only counts if it has weight
+        return np.exp(out)
+
+    def curves(self, ages: Sequence[float], sum_assured: Sequence[float], terms: Sequence[float],
+               providers: Optional[Sequence[str]] = None) -> Dict:
+        """Premiums over the full ages × sum_assured × terms product, per provider and market-wide."""
+        keep = [i for i, name in enumerate(self.providers) if providers is None or name in providers]
+        a, s, t = np.meshgrid(ages, sum_assured, terms, indexing="ij")
+        shape = a.shape
+        premiums = self.lookup(a.ravel(), s.ravel(), t.ravel())[keep]
+
+        def cells(values: np.ndarray) -> list:
+            values = values.reshape(shape)
+            missing = np.isnan(values)
+            rounded = np.round(np.where(missing, 0, values)).astype(np.int64).astype(object)
+            rounded[missing] = None
+            return rounded.tolist()
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)       # all-NaN cells → None
+            market = {
+                "min": cells(np.nanmin(premiums, axis=0)),
+                "typical": cells(np.nanmedian(premiums, axis=0)),
+                "max": cells(np.nanmax(premiums, axis=0)),
+            } if keep else {}
+        return {
+            "market": market,
+            "providers": {self.providers[i]: cells(row) for i, row in zip(keep, premiums)},
+        }
+
+
+_grid_lock = threading.Lock()
+_grid: Optional[PremiumGrid] = None
+
+
+def premium_grid(snap: PlanSnapshot) -> PremiumGrid:
+    """The PremiumGrid for `snap`, rebuilt only when the snapshot version changes."""
+    global _grid
+    g = _grid
+    if g is not None and g.version == snap.version:
+        return g
+    with _grid_lock:
+        if _grid is None or _grid.version != snap.version:
+            _grid = PremiumGrid.from_snapshot(snap)
+        return _grid
@@ -0,0 +1,87 @@
+"""
+Compact, token-efficient encoding of plan tables for Gemini prompts.
+
+Instead of pretty-printed JSON (every key repeated per plan, indentation,
+quotes), plans are sent as one header row plus pipe-delimited rows with
+short column codes. Feature strings shared by two or more plans are listed
+once as F1, F2, … and referenced by code.
+
+    Feature codes: F1=Critical illness rider; F2=Waiver of premium
+    id|plan|insurer|prem|sa_L|term_y|csr|feat
+    1|Smart Term Plan Plus|Axis Max Life|11868|25-100000|10-50|99.65|F1;F2;Joint life cover
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+# Column header explained to the model once per prompt
+PLAN_TABLE_LEGEND = (
+    "Columns: id = plan number (use it to refer to the plan); prem = annual premium in INR; "
+    "sa_L = sum assured range in ₹ Lakhs; term_y = policy term range in years; "
+    "csr = claim settlement ratio %; feat = features (F-codes defined above); blank = unknown"
+)
+_HEADER = "id|plan|insurer|prem|sa_L|term_y|csr|feat"
+
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Gemini token count without a network round trip: one token per
+    punctuation mark, one per ~4 characters of each word.
+    """
+    return sum(math.ceil(len(piece) / 4) for piece in _TOKEN_PIECE.findall(text))
+
+
+def _num(value) -> str:
+    if value is None:
+        return ""
+    value = float(value)
+    return str(int(value)) if value.is_integer() else f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _range(low, high) -> str:
+    return _num(low) if low == high else f"{_num(low)}-{_num(high)}"
+
+
+def _cell(text: Optional[str]) -> str:
+    return (text or "").replace("|", "/").replace("\n", " ").strip()
+
+
+def _features(plan: Dict) -> List[str]:
+    return [_cell(f).replace(";", ",") for f in (plan.get("key_features") or "").split("|") if f.strip()]
+
+
+def encode_plan_table(plans: Sequence[Dict]) -> str:
+    """Plans (ANALYSIS_FIELDS dicts) as a compact table; row ids are 1-based positions in `plans`."""
+    per_plan = [_features(p) for p in plans]
+    counts = Counter(f for feats in per_plan for f in set(feats))
+    shared = sorted((f for f, n in counts.items() if n > 1), key=lambda f: (-counts[f], f))
+    codes = {f: f"F{i}" for i, f in enumerate(shared, 1)}
+
+    lines = []
+    if codes:
+        lines.append("Feature codes: " + "; ".join(f"{code}={f}" for f, code in codes.items()))
+    lines.append(_HEADER)
+    for i, (p, feats) in enumerate(zip(plans, per_plan), 1):
+        lines.append("|".join((
+            str(i),
+            _cell(p.get("plan_name")),
+            _cell(p.get("provider")),
+            _num(p.get("premium_annual") or None),
+            _range(p.get("sum_assured_min"), p.get("sum_assured_max")),
+            _range(p.get("policy_term_min"), p.get("policy_term_max")),
+            _num(p.get("claim_settlement_ratio")),
+            ";".join(codes.get(f, f) for f in feats),
+        )))
+    return "\n".join(lines)
+
+
+def plan_for_id(plans: Sequence[Dict], plan_id) -> Optional[Dict]:
+    """The plan a model referred to by its table id (1-based), or None."""
+    try:
+        index = int(plan_id) - 1
+    except (TypeError, ValueError):
+        return None
+    return plans[index] if 0 <= index < len(plans) else None
@@ -0,0 +1,374 @@
+"""
+Local, vectorized ranking engine for /api/recommend.
+
+The plan catalog of a snapshot is held as NumPy columns (built once per
+snapshot version). Profiles are scored against every plan in one pass:
+eligibility masks plus a weighted multi-criteria score (0–100) over claim
+settlement ratio, premium vs. budget, policy-term fit, sum-assured coverage
+and entry-age headroom. Budgets are checked against each plan's premium at the
+profile's age (its scraped age curve, else premium_model's age factor), not
+the age-30 premium_annual. Gemini is an optional enrichment on top of this.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from plan_snapshot import ANALYSIS_FIELDS, PlanRecord, PlanSnapshot
+from premium_model import premium_model
+
+# Relative weight of each criterion in the 0–100 score (sums to 1)
+WEIGHTS = {
+    "csr": 0.35,
+    "budget": 0.30,
+    "term": 0.15,
+    "cover": 0.10,
+    "age": 0.10,
+}
+
+_CSR_FLOOR = 90.0          # CSR at or below this scores 0 on the CSR criterion
+_TERM_SLACK = 10.0         # years outside the offered term range before the term score hits 0
+_AGE_HEADROOM = 20.0       # years below max entry age that count as full headroom
+PREMIUM_AGES = np.arange(18, 71, dtype=np.float64)     # entry ages with a precomputed premium
+
+
+@dataclass(frozen=True)
+class PlanMatrix:
+    """Columnar view of one snapshot's plans (row i == plans[i])."""
+    version: int
+    plans: Tuple[PlanRecord, ...]
+    premium: np.ndarray        # (plans × PREMIUM_AGES) annual premium at each entry age; NaN when unknown
+    csr: np.ndarray
+    sa_min: np.ndarray
+    sa_max: np.ndarray
+    term_min: np.ndarray
+    term_max: np.ndarray
+    age_min: np.ndarray
+    age_max: np.ndarray
+
+    @classmethod
+    def from_snapshot(cls, snap: PlanSnapshot) -> "PlanMatrix":
+        def col(attr: str, missing: float) -> np.ndarray:
+            values = [getattr(p, attr) for p in snap.plans]
+            return np.array([missing if v is None else v for v in values], dtype=np.float64)
+
+        premium = np.array([premium_model.plan_premiums(p, PREMIUM_AGES) for p in snap.plans])
+        return cls(
+            version=snap.version,
+            plans=snap.plans,
+            premium=premium.reshape(len(snap.plans), len(PREMIUM_AGES)),
+            csr=col("claim_settlement_ratio", 0.0),
+            sa_min=col("sum_assured_min", 0.0),
+            sa_max=col("sum_assured_max", np.inf),
+            term_min=col("policy_term_min", 0.0),
+            term_max=col("policy_term_max", 99.0),
+            age_min=col("age_min", 0.0),
+            age_max=col("age_max", 99.0),
+        )
+
+
+@dataclass(frozen=True)
+class ScoreMatrix:
+    """(profiles × plans) scores and per-criterion flags."""
+    scores: np.ndarray
+    premium: np.ndarray        # each plan's annual premium at the profile's age (NaN when unknown)
+    eligible: np.ndarray       # age within the plan's entry-age range
+    within_budget: np.ndarray
+    csr_ok: np.ndarray
+    term_ok: np.ndarray
+    cover_ok: np.ndarray
+
+
+_matrix_lock = threading.Lock()
+_matrix: Optional[PlanMatrix] = None
+
+
+def plan_matrix(snap: PlanSnapshot) -> PlanMatrix:
+    """The PlanMatrix for `snap`, rebuilt only when the snapshot version changes."""
+    global _matrix
+    m = _matrix
+    if m is not None and m.version == snap.version:
+        return m
+    with _matrix_lock:
+        if _matrix is None or _matrix.version != snap.version:
+            _matrix = PlanMatrix.from_snapshot(snap)
+        return _matrix
+
+
+def _profile_column(profiles: Sequence[Mapping], key: str, default: float) -> np.ndarray:
+    return np.array([[float(p.get(key, default))] for p in profiles], dtype=np.float64)
+
+
+def score_profiles(m: PlanMatrix, profiles: Sequence[Mapping]) -> ScoreMatrix:
+    """Score every profile against every plan in one vectorized pass."""
+    age = _profile_column(profiles, "age", 30)
+    sum_assured = _profile_column(profiles, "sum_assured", 0)
+    budget = _profile_column(profiles, "premium_budget", np.inf)
+    term = _profile_column(profiles, "policy_term", 0)
+    min_csr = _profile_column(profiles, "min_csr", 0)
+
+    eligible = (m.age_min <= age) & (age <= m.age_max)
+
+    csr_ok = m.csr >= min_csr
+    csr_score = np.clip((m.csr - _CSR_FLOOR) / (100.0 - _CSR_FLOOR), 0, 1) * np.where(csr_ok, 1.0, 0.5)
+
+    age_index = np.clip(np.rint(age[:, 0]) - PREMIUM_AGES[0], 0, len(PREMIUM_AGES) - 1).astype(int)
+    at_age = m.premium[:, age_index].T
+    known = ~np.isnan(at_age)
+    premium = np.where(known, at_age, 0.0)
+    within_budget = ~known | (premium <= budget)
+    ratio = premium / budget
+    budget_score = np.where(
+        ~known, 0.5,
+        np.where(within_budget, 0.5 + 0.5 * (1 - ratio), 0.5 * np.clip(2 - ratio, 0, 1)),
+    )
+
+    term_gap = np.maximum(np.maximum(m.term_min - term, term - m.term_max), 0)
+    term_ok = term_gap == 0
+    term_score = np.clip(1 - term_gap / _TERM_SLACK, 0, 1)
+
+    cover_ok = (m.sa_min <= sum_assured) & (sum_assured <= m.sa_max)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover_score = np.where(
+            cover_ok, 1.0,
+            np.where(sum_assured > m.sa_max, m.sa_max / sum_assured, sum_assured / m.sa_min),
+        )
+    cover_score = np.clip(np.nan_to_num(cover_score), 0, 1)
+
+    age_score = np.clip((m.age_max - age) / _AGE_HEADROOM, 0, 1)
+
+    scores = 100 * (
+        WEIGHTS["csr"] * csr_score
+        + WEIGHTS["budget"] * budget_score
+        + WEIGHTS["term"] * term_score
+        + WEIGHTS["cover"] * cover_score
+        + WEIGHTS["age"] * age_score
+    )
+    shape = scores.shape
+    return ScoreMatrix(
+        scores=scores,
+        premium=at_age,
+        eligible=eligible,
+        within_budget=np.broadcast_to(within_budget, shape),
+        csr_ok=np.broadcast_to(csr_ok, shape),
+        term_ok=np.broadcast_to(term_ok, shape),
+        cover_ok=cover_ok,
+    )
+
+
+def _lakhs(value: Optional[float]) -> str:
+    if not value:
+        return "—"
+    return f"₹{value / 100:g} Cr" if value >= 100 else f"₹{value:g} L"
+
+
+@dataclass(frozen=True)
+class Ranking:
+    """One profile's plans, best first (age-eligible plans only, or all if none are)."""
+    profile: Mapping
+    plans: Tuple[PlanRecord, ...]
+    scores: np.ndarray
+    premium: np.ndarray        # annual premium at the profile's age (NaN when unknown)
+    within_budget: np.ndarray
+    csr_ok: np.ndarray
+    term_ok: np.ndarray
+    cover_ok: np.ndarray
+
+    def as_result(self, top_n: Optional[int] = None) -> Dict:
+        """Recommendation payload in the same shape as the Gemini response (best `top_n` plans)."""
+        ranked = [self._ranked_plan(i) for i in range(min(len(self.plans), top_n or len(self.plans)))]
+        if not ranked:
+            return {"overall_summary": "No plans available.", "top_pick": "N/A",
+                    "ranked_plans": [], "engine": "local"}
+        top = self.plans[0]
+        fit = "within" if self.within_budget[0] else "above"
+        return {
+            "overall_summary": (
+                f"'{top.plan_name}' by {top.provider} scores highest for your profile "
+                f"({ranked[0]['score']}/100): a claim settlement ratio of {top.claim_settlement_ratio}% "
+                f"and a premium {fit} your ₹{self.profile.get('premium_budget'):,.0f} budget. "
+                f"Plans are ranked on CSR, affordability, policy-term fit, coverage and entry-age headroom."
+            ),
+            "top_pick": f"{top.plan_name} by {top.provider}",
+            "ranked_plans": ranked,
+            "engine": "local",
+        }
+
+    def as_comparison(self) -> Dict:
+        """
+        /api/compare payload for these plans, computed from the snapshot alone:
+        the compared plans (columns, best first), a side-by-side table whose
+        values and winner_plan refer to plan ids, the best-scoring plan as
+        winner and rule-based strengths / weaknesses.
+        """
+        if not self.plans:
+            return {"verdict": "No plans to compare.", "winner": "N/A", "winner_id": None, "plans": [],
+                    "comparison_table": [], "detailed_comparison": [], "engine": "local"}
+        ranked = [self._ranked_plan(i) for i in range(len(self.plans))]
+        top = self.plans[0]
+        return {
+            "verdict": (
+                f"'{top.plan_name}' by {top.provider} scores highest for your profile "
+                f"({ranked[0]['score']}/100) on claim settlement ratio, affordability at your age, "
+                f"policy-term fit, coverage and entry-age headroom."
+            ),
+            "winner": top.plan_name,
+            "winner_id": top.id,
+            "plans": [{"id": p.id, "plan_name": p.plan_name, "provider": p.provider} for p in self.plans],
+            "comparison_table": self._comparison_rows(),
+            "detailed_comparison": [
+                {"plan_id": p.id, "plan_name": p.plan_name, "provider": p.provider, "strengths": r["pros"],
+                 "weaknesses": r["cons"], "best_for": ""}
+                for p, r in zip(self.plans, ranked)
+            ],
+            "engine": "local",
+        }
+
+    def _comparison_rows(self) -> List[Dict]:
+        plans, profile = self.plans, self.profile
+        ids = [p.id for p in plans]
+
+        def best(values: Sequence[float], mask: Optional[np.ndarray] = None, lowest: bool = False) -> Optional[int]:
+            """Id of the plan with the best value (among `mask`); None when no plan qualifies or it is a tie."""
+            v = np.array(values, dtype=np.float64) * (-1 if lowest else 1)
+            v[np.isnan(v)] = -np.inf
+            if mask is not None:
+                v[~mask] = -np.inf
+            top = np.flatnonzero(v == v.max())
+            return ids[top[0]] if np.isfinite(v.max()) and top.size == 1 else None
+
+        def row(aspect: str, values: Sequence[str], winner: Optional[int], why: str) -> Dict:
+            return {"aspect": aspect, "values": dict(zip(ids, values)), "winner_plan": winner, "why": why}
+
+        csr = [p.claim_settlement_ratio or np.nan for p in plans]
+        sa_max = [p.sum_assured_max or np.nan for p in plans]
+        term_max = [p.policy_term_max or np.nan for p in plans]
+        return [
+            row("Claim Settlement Ratio", ["—" if np.isnan(v) else f"{v:g}%" for v in csr], best(csr),
+                "Higher CSR means more reliable claim payments"),
+            row(f"Annual Premium (age {profile.get('age')})",
+                ["—" if np.isnan(v) else f"₹{v:,.0f}/yr" for v in self.premium],
+                best(self.premium, lowest=True),
+                f"Indicative premium at your age; your budget is ₹{profile.get('premium_budget'):,.0f}/yr"),
+            row("Sum Assured Range", [f"{_lakhs(p.sum_assured_min)} – {_lakhs(p.sum_assured_max)}" for p in plans],
+                best(sa_max, self.cover_ok), f"Must include your ₹{profile.get('sum_assured'):g}L cover"),
+            row("Policy Term", [f"{p.policy_term_min}–{p.policy_term_max} years" for p in plans],
+                best(term_max, self.term_ok), f"Must offer your {profile.get('policy_term')}-year term"),
+            row("Entry Age", [f"{p.age_min}–{p.age_max} years" for p in plans], None,
+                f"You are {profile.get('age')}"),
+            row("Key Features", [" · ".join(r for r in (p.key_features or "").split("|")[:3] if r) or "—"
+                                 for p in plans], None, ""),
+            row("Value for Money", [f"{v:.1f}/100" for v in self.scores], best(self.scores),
+                "Local score across CSR, affordability, term fit, coverage and entry-age headroom"),
+        ]
+
+    def shortlist(self, n: int, budget_tolerance: float) -> Tuple[PlanRecord, ...]:
+        """
+        The best `n` plans that pass every hard constraint — term offered, cover
+        in range, CSR at or above the floor, premium within budget × (1 + tolerance).
+        Falls back to the best `n` overall when nothing passes.
+        """
+        budget = float(self.profile.get("premium_budget", np.inf)) * (1 + budget_tolerance)
+        premium = np.nan_to_num(self.premium)
+        passing = np.flatnonzero(self.term_ok & self.cover_ok & self.csr_ok & (premium <= budget))
+        if passing.size == 0:
+            passing = np.arange(len(self.plans))
+        return tuple(self.plans[i] for i in passing[:n])
+
+    def as_dicts(self, plans: Sequence[PlanRecord], keys: Tuple[str, ...] = ANALYSIS_FIELDS) -> List[Dict]:
+        """`keys` dicts of `plans`, with premium_annual quoted at the profile's age."""
+        at_age = {p.id: premium for p, premium in zip(self.plans, self.premium)}
+        dicts = []
+        for p in plans:
+            d = p.as_dict(keys)
+            premium = at_age.get(p.id, np.nan)
+            d["premium_annual"] = None if np.isnan(premium) else round(float(premium))
+            dicts.append(d)
+        return dicts
+
+    def merge_head(self, head: List[Dict]) -> List[Dict]:
+        """
+        `head` (the LLM's ranking of the shortlist) followed by every other plan
+        in local order, including shortlisted plans the LLM left out of its reply.
+        """
+        taken = {(entry.get("plan_name"), entry.get("provider")) for entry in head}
+        tail = [
+            self._ranked_plan(i) for i, p in enumerate(self.plans)
+            if (p.plan_name, p.provider) not in taken
+        ]
+        for rank, entry in enumerate(tail, len(head) + 1):
+            entry["rank"] = rank
+        return list(head) + tail
+
+    def _ranked_plan(self, i: int) -> Dict:
+        p, profile, premium = self.plans[i], self.profile, self.premium[i]
+        reason, cons = [], []
+        if np.isnan(premium):
+            reason.append("Premium not published.")
+        elif self.within_budget[i]:
+            reason.append(f"Within budget at about ₹{premium:,.0f}/yr for age {profile.get('age')}.")
+        else:
+            reason.append(f"Exceeds budget at about ₹{premium:,.0f}/yr for age {profile.get('age')}.")
+            cons.append(f"₹{premium - profile['premium_budget']:,.0f}/yr over budget")
+        reason.append(f"Claim settlement ratio: {p.claim_settlement_ratio}%.")
+        if not self.csr_ok[i]:
+            cons.append(f"CSR below your {profile.get('min_csr')}% minimum")
+        if not self.term_ok[i]:
+            cons.append(f"{profile.get('policy_term')}-year term not offered "
+                        f"({p.policy_term_min}–{p.policy_term_max} years)")
+        if not self.cover_ok[i]:
+            cons.append(f"₹{profile.get('sum_assured')}L cover outside the "
+                        f"₹{p.sum_assured_min}–{p.sum_assured_max}L range")
+        return {
+            "rank": i + 1,
+            "plan_name": p.plan_name,
+            "provider": p.provider,
+            "score": round(float(self.scores[i]), 1),
+            "reason": " ".join(reason),
+            "pros": (p.key_features or "").split("|")[:3],
+            "cons": cons,
+            "within_budget": bool(self.within_budget[i]),
+            "claim_settlement_ratio": p.claim_settlement_ratio,
+        }
+
+
+def ranking_for(m: PlanMatrix, s: ScoreMatrix, row: int, profile: Mapping,
+                candidates: Optional[np.ndarray] = None) -> Ranking:
+    """Extract one profile's Ranking from a ScoreMatrix row (over `candidates`, default age-eligible plans)."""
+    if candidates is None:
+        candidates = np.flatnonzero(s.eligible[row])
+        if candidates.size == 0:
+            candidates = np.arange(len(m.plans))
+    # Stable sort: ties keep snapshot order (CSR desc, id asc)
+    order = candidates[np.argsort(-s.scores[row, candidates], kind="stable")]
+    return Ranking(
+        profile=profile,
+        plans=tuple(m.plans[i] for i in order),
+        scores=s.scores[row, order],
+        premium=s.premium[row, order],
+        within_budget=s.within_budget[row, order],
+        csr_ok=s.csr_ok[row, order],
+        term_ok=s.term_ok[row, order],
+        cover_ok=s.cover_ok[row, order],
+    )
+
+
+def rank_plans(snap: PlanSnapshot, profile: Mapping) -> Ranking:
+    """Rank the snapshot's plans for a single user profile."""
+    m = plan_matrix(snap)
+    return ranking_for(m, score_profiles(m, [profile]), 0, profile)
+
+
+def rank_selected(snap: PlanSnapshot, profile: Mapping, plan_ids: Sequence[int]) -> Ranking:
+    """Rank just the given plans for a profile, best first (age-ineligible ones included)."""
+    m = plan_matrix(snap)
+    wanted = set(plan_ids)
+    candidates = np.array([i for i, p in enumerate(m.plans) if p.id in wanted], dtype=np.intp)
+    return ranking_for(m, score_profiles(m, [profile]), 0, profile, candidates)
+
+
+def rank_profiles(m: PlanMatrix, profiles: Sequence[Mapping]) -> List[Ranking]:
+    """Rank one PlanMatrix for many profiles with a single (profiles × plans) computation."""
+    s = score_profiles(m, profiles)
+    return [ranking_for(m, s, row, p) for row, p in enumerate(profiles)]
@@ -0,0 +1,105 @@
+"""
+LRU + TTL cache of Gemini-enriched /api/recommend results.
+
+Keys are (plan snapshot version, canonicalized profile). Age, budget and sum
+assured can be bucketed so nearby profiles share an entry:
+
+  RECOMMEND_CACHE_AGE_BUCKET=5        # years      (default 1 — exact age)
+  RECOMMEND_CACHE_BUDGET_BUCKET=1000  # INR        (default 0 — exact budget)
+  RECOMMEND_CACHE_SA_BUCKET=25        # ₹ Lakhs    (default 0 — exact cover)
+
+A new snapshot version (scrape or manual edit that changed the catalog)
+empties the cache, so a stale plan set is never served.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Mapping, Optional, Tuple
+
+from settings import env_float, env_int
+
+
+def _bucket(value: float, size: float) -> float:
+    value = float(value)
+    return math.floor(value / size) * size if size > 0 else round(value, 2)
+
+
+def profile_key(profile: Mapping) -> Tuple:
+    """Canonical, bucketed form of a recommendation profile."""
+    return (
+        _bucket(profile["age"], env_float("RECOMMEND_CACHE_AGE_BUCKET", 1)),
+        _bucket(profile["sum_assured"], env_float("RECOMMEND_CACHE_SA_BUCKET", 0)),
+        _bucket(profile["premium_budget"], env_float("RECOMMEND_CACHE_BUDGET_BUCKET", 0)),
+        int(profile["policy_term"]),
+        round(float(profile.get("min_csr", 0)), 2),
+    )
+
+
+class RecommendationCache:
+    """Thread-safe LRU with per-entry TTL, scoped to one plan snapshot version."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def _current(self, version: int) -> bool:
+        """Drop every entry once a newer plan snapshot is seen; False for an older one. Caller holds _lock."""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                self._counts["invalidations"] += 1
+            self._entries.clear()
+            self._version = version
+        return True
+
+    def get(self, version: int, profile: Mapping) -> Optional[Dict]:
+        key = profile_key(profile)
+        with self._lock:
+            entry = self._entries.get(key) if self._current(version) else None
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._counts["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return entry[1]
+
+    def put(self, version: int, profile: Mapping, result: Dict):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        key = profile_key(profile)
+        with self._lock:
+            if not self._current(version):
+                return                      # computed against a snapshot that has since been replaced
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "hit_rate": round(self._counts["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "plan_version": self._version,
+            }
+
+
+recommendation_cache = RecommendationCache(
+    max_entries=env_int("RECOMMEND_CACHE_SIZE", 512),
+    ttl_seconds=env_float("RECOMMEND_CACHE_TTL", 3600),
+)
@@ -12,6 +12,8 @@ import requests
 from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 
+from scraper.reference_data import PREMIUM_MAP
+
 logger = logging.getLogger(__name__)
 
 URL = "https://www.coverfox.com/term-insurance/"
@@ -27,31 +29,6 @@ HEADERS = {
     "Referer": "https://www.google.com",
 }
 
-# Premium estimates (annual ₹, ₹1Cr cover, 30-yr male non-smoker)
-PREMIUM_MAP = {
-    "icici":    8800,
-    "aegon":    7600,
-    "hdfc":     9200,
-    "max":      8100,
-    "lic":      8500,
-    "tata":     8300,
-    "sbi":      7800,
-    "bajaj":    7200,
-    "kotak":    7500,
-    "pnb":      8400,
-    "edelweiss":7700,
-    "reliance": 7600,
-    "canara":   7900,
-    "aditya":   8600,
-    "future":   7400,
-    "bharti":   8200,
-    "aviva":    8000,
-    "idbi":     8300,
-    "india first": 7500,
-    "birla":    8600,
-    "axis max": 9000,
-}
-
 PLAN_NAME_MAP = {
     "icici":       "iProtect Smart",
     "aegon":       "iTerm Prime Plan",
@@ -13,6 +13,8 @@ import requests
 from bs4 import BeautifulSoup
 from typing import List, Dict
 
+from scraper.reference_data import AGE_PREMIUM_MAP
+
 logger = logging.getLogger(__name__)
 
 URL = "https://www.hdfclife.com/term-insurance-plans"
@@ -37,6 +39,7 @@ HDFC_PLANS = [
         "sum_assured_min": 50,
         "sum_assured_max": 20000,
         "premium_annual": 11904,    # ₹992/month × 12 (30-yr non-smoker, base)
+        "premium_curve": AGE_PREMIUM_MAP,
         "policy_term_min": 10,
         "policy_term_max": 40,
         "age_min": 18,
@@ -77,14 +80,6 @@ HDFC_PLANS = [
     },
 ]
 
-# Age → annual premium map for Click 2 Protect Super (1 Crore base, monthly × 12)
-AGE_PREMIUM_MAP = {
-    20: 9264,   # ₹772/month
-    30: 11904,  # ₹992/month
-    40: 23412,  # ₹1951/month
-    50: 51456,  # ₹4288/month
-}
-
 
 def scrape_hdfclife() -> List[Dict]:
     """
@@ -120,15 +115,27 @@ def scrape_hdfclife() -> List[Dict]:
                         parsed_age_map[age] = int(pval * 12)  # monthly → annual
                 break
 
-        # Build plans using scraped data where available, else fallback
-        age_map = parsed_age_map if parsed_age_map else AGE_PREMIUM_MAP
+        # Build plans using scraped data where available, else fallback. A partly parsed
+        # table would replace the stored curve with a sparse one, so only a curve that
+        # covers every reference age is published; otherwise the plan carries no curve
+        # and _upsert_plans keeps the stored one.
+        complete = set(AGE_PREMIUM_MAP) <= set(parsed_age_map)
+        if parsed_age_map and not complete:
+            logger.info(
+                f"HDFCLife: premium table only gave ages {sorted(parsed_age_map)}; keeping the stored curve"
+            )
 
         plans = []
         for plan in HDFC_PLANS:
             p = dict(plan)
-            # Use age=30 as reference premium if scraped
-            if "click 2 protect super" in p["plan_name"].lower() and 30 in age_map:
-                p["premium_annual"] = age_map[30]
+            # Keep the whole age curve; age 30 stays the reference premium if scraped
+            if "click 2 protect super" in p["plan_name"].lower():
+                if complete:
+                    p["premium_curve"] = parsed_age_map
+                elif parsed_age_map:
+                    del p["premium_curve"]
+                if 30 in parsed_age_map:
+                    p["premium_annual"] = parsed_age_map[30]
             plans.append(p)
 
         logger.info(f"HDFCLife: returning {len(plans)} plans")
@@ -0,0 +1,38 @@
+"""
+Reference premium data shared by the scrapers and the local premium model
+(premium_model.py). Kept free of scraping dependencies so the API can import
+it without pulling in requests / BeautifulSoup.
+"""
+
+# Age → annual premium map for HDFC Click 2 Protect Super (1 Crore base, monthly × 12)
+AGE_PREMIUM_MAP = {
+    20: 9264,   # ₹772/month
+    30: 11904,  # ₹992/month
+    40: 23412,  # ₹1951/month
+    50: 51456,  # ₹4288/month
+}
+
+# Premium estimates by provider (annual ₹, ₹1Cr cover, 30-yr male non-smoker), as used by coverfox.py
+PREMIUM_MAP = {
+    "icici":    8800,
+    "aegon":    7600,
+    "hdfc":     9200,
+    "max":      8100,
+    "lic":      8500,
+    "tata":     8300,
+    "sbi":      7800,
+    "bajaj":    7200,
+    "kotak":    7500,
+    "pnb":      8400,
+    "edelweiss":7700,
+    "reliance": 7600,
+    "canara":   7900,
+    "aditya":   8600,
+    "future":   7400,
+    "bharti":   8200,
+    "aviva":    8000,
+    "idbi":     8300,
+    "india first": 7500,
+    "birla":    8600,
+    "axis max": 9000,
+}
@@ -7,151 +7,406 @@ Sources (in priority order):
   4. MaxLife         — Axis Max Life official site plans (requests + BS4)
   5. HDFCLife        — HDFC Life official site plans (requests + BS4)
   6. BankBazaar      — live comparison table (requests + BS4)
-  7. Seed data       — guaranteed fallback    (hardcoded, 29 plans)
+  7. PolicyBazaar    — optional, Playwright (often blocked)
+  8. InsuranceDekho  — optional, Playwright (often blocked)
+  9. Seed data       — guaranteed fallback    (hardcoded, 29 plans)
+
+Sources are fetched concurrently but always applied to the DB in this order.
 """
+import importlib
 import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 
-from database import SessionLocal, InsurancePlan
+from database import SessionLocal, InsurancePlan, PlanChange, PlanPremiumCurve, bump_catalog_version
+from plan_snapshot import refresh_snapshot
+from settings import env_float, env_int
 from scraper.seed_data import SEED_PLANS
-from scraper.bankbazaar import scrape_bankbazaar
-from scraper.policyx import scrape_policyx
-from scraper.coverfox import scrape_coverfox
-from scraper.coverfox_csr import scrape_coverfox_csr
-from scraper.maxlife import scrape_maxlife
-from scraper.hdfclife import scrape_hdfclife
-from scraper.policybazaar import scrape_policybazaar
-from scraper.insurancedekho import scrape_insurancedekho
 
 logger = logging.getLogger(__name__)
 
 
-def _upsert_plans(plans: list, db: Session):
-    """Insert or update plans matched by plan_name + provider."""
-    for p in plans:
-        existing = (
-            db.query(InsurancePlan)
-            .filter(
-                InsurancePlan.plan_name == p["plan_name"],
-                InsurancePlan.provider == p["provider"],
-            )
-            .first()
+def _lazy(module: str, attr: str) -> Callable[[], List[Dict]]:
+    """A scraper imported on its first run, so requests/bs4 stay off the API's startup path."""
+    def fetch() -> List[Dict]:
+        return getattr(importlib.import_module(module), attr)()
+    fetch.__name__ = attr
+    fetch.__qualname__ = attr
+    return fetch
+
+
+# (name, scraper, optional, default timeout in seconds — None uses SCRAPE_SOURCE_TIMEOUT)
+# Order matters: later sources override earlier ones for the same plan_name + provider.
+SCRAPERS: List[Tuple[str, Callable[[], List[Dict]], bool, Optional[float]]] = [
+    ("PolicyX",        _lazy("scraper.policyx", "scrape_policyx"),               False, 30),
+    ("Coverfox",       _lazy("scraper.coverfox", "scrape_coverfox"),             False, 30),
+    ("CoverfoxCSR",    _lazy("scraper.coverfox_csr", "scrape_coverfox_csr"),     False, 30),
+    ("MaxLife",        _lazy("scraper.maxlife", "scrape_maxlife"),               False, 30),
+    ("HDFCLife",       _lazy("scraper.hdfclife", "scrape_hdfclife"),             False, 30),
+    ("BankBazaar",     _lazy("scraper.bankbazaar", "scrape_bankbazaar"),         False, 30),
+    ("PolicyBazaar",   _lazy("scraper.policybazaar", "scrape_policybazaar"),     True,  None),   # Playwright, 60s internal limit
+    ("InsuranceDekho", _lazy("scraper.insurancedekho", "scrape_insurancedekho"), True,  None),   # Playwright, 60s internal limit
+]
+
+
+_KEY_COLUMNS = ("plan_name", "provider")
+_PLAN_COLUMNS = [c for c in InsurancePlan.__table__.columns if c.name not in ("id", "scraped_at")]
+_PLAN_DEFAULTS = {c.name: (c.default.arg if c.default is not None else None) for c in _PLAN_COLUMNS}
+_DIFF_FIELDS = tuple(c.name for c in _PLAN_COLUMNS if c.name not in _KEY_COLUMNS)
+_KEY_CHUNK = 400   # keeps (plan_name, provider) IN (...) well under SQLite's bind-parameter limit
+
+
+def _normalize_plan(p: Dict) -> Dict:
+    """Full column dict for a scraped plan so bulk statements get uniform parameter sets."""
+    return {name: p.get(name, default) for name, default in _PLAN_DEFAULTS.items()}
+
+
+def _normalize_curve(curve: Dict) -> Tuple[Tuple[int, float], ...]:
+    """A scraped {age: annual premium} map as sorted (age, premium) points, unusable points dropped."""
+    return tuple(sorted((int(age), float(premium)) for age, premium in curve.items() if premium and premium > 0))
+
+
+def _format_curve(curve: Tuple[Tuple[int, float], ...]) -> str:
+    return ",".join(f"{age}:{premium:g}" for age, premium in curve)
+
+
+def _same_value(old, new) -> bool:
+    """Compare a stored column value with a scraped one (25 == 25.0, float noise ignored)."""
+    numeric = (int, float)
+    if isinstance(old, numeric) and isinstance(new, numeric) and not isinstance(old, bool):
+        return math.isclose(old, new, rel_tol=1e-9, abs_tol=1e-9)
+    return old == new
+
+
+def _existing_rows_query(keys: List[Tuple[str, str]]):
+    key_cols = tuple_(InsurancePlan.plan_name, InsurancePlan.provider)
+    return select(InsurancePlan.id, *_PLAN_COLUMNS).where(
+        # SQLite can't seek an index with a row-value IN list alone; the plan_name IN
+        # gives it a lookup on the unique index's leading column.
+        InsurancePlan.plan_name.in_(sorted({name for name, _ in keys})),
+        key_cols.in_(keys),
+    )
+
+
+def _existing_rows(keys: List[Tuple[str, str]], db: Session) -> Dict[Tuple[str, str], Dict]:
+    """Load stored rows for the batch's (plan_name, provider) keys in a few set-based queries."""
+    found = {}
+    for i in range(0, len(keys), _KEY_CHUNK):
+        rows = db.execute(_existing_rows_query(keys[i:i + _KEY_CHUNK]))
+        for row in rows.mappings():
+            found[(row["plan_name"], row["provider"])] = row
+    return found
+
+
+def _stored_curves(plan_ids: List[int], db: Session) -> Dict[int, Tuple[Tuple[int, float], ...]]:
+    curves = defaultdict(list)
+    for i in range(0, len(plan_ids), _KEY_CHUNK):
+        rows = db.execute(
+            select(PlanPremiumCurve.plan_id, PlanPremiumCurve.age, PlanPremiumCurve.premium)
+            .where(PlanPremiumCurve.plan_id.in_(plan_ids[i:i + _KEY_CHUNK]))
+            .order_by(PlanPremiumCurve.plan_id, PlanPremiumCurve.age)
+        )
+        for plan_id, age, premium in rows:
+            curves[plan_id].append((age, premium))
+    return {plan_id: tuple(points) for plan_id, points in curves.items()}
+
+
+def _replace_curves(curves: Dict[int, Tuple[Tuple[int, float], ...]], db: Session):
+    """Swap in the given plans' premium curves (an empty curve just clears the stored one)."""
+    plan_ids = list(curves)
+    for i in range(0, len(plan_ids), _KEY_CHUNK):
+        db.execute(delete(PlanPremiumCurve).where(PlanPremiumCurve.plan_id.in_(plan_ids[i:i + _KEY_CHUNK])))
+    points = [
+        {"plan_id": plan_id, "age": age, "premium": premium}
+        for plan_id, curve in curves.items() for age, premium in curve
+    ]
+    if points:
+        db.execute(insert(PlanPremiumCurve), points)
+
+
+def _bulk_update(rows: List[Dict], fields: Tuple[str, ...], db: Session, now: datetime):
+    """
+    Write `fields` (plus scraped_at) for existing plans: INSERT … ON CONFLICT DO UPDATE
+    where the dialect supports it, an executemany UPDATE on the natural key otherwise.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(InsurancePlan)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(_KEY_COLUMNS),
+            set_={**{f: stmt.excluded[f] for f in fields}, "scraped_at": now},
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Generic fallback: executemany UPDATE matched on the natural key
+    stmt = (
+        update(InsurancePlan)
+        .where(
+            InsurancePlan.plan_name == bindparam("key_plan_name"),
+            InsurancePlan.provider == bindparam("key_provider"),
+        )
+        .values(**{f: bindparam(f) for f in fields}, scraped_at=now)
+    )
+    # Only the changed columns in each parameter set: extra keys would be rendered into SET too
+    db.connection().execute(
+        stmt,
+        [{**{f: r[f] for f in fields}, "key_plan_name": r["plan_name"], "key_provider": r["provider"]} for r in rows],
+    )
+
+
+def _upsert_plans(plans: list, db: Session) -> Dict[str, int]:
+    """
+    Insert or update plans matched by plan_name + provider.
+    Stored rows for the whole batch are loaded at once and diffed against the scraped
+    dicts: new plans are bulk-inserted, plans with real field changes get only those
+    fields (and scraped_at) rewritten plus one plan_changes row per field, and
+    unchanged plans are not touched at all. A plan's optional "premium_curve"
+    ({age: annual premium}) replaces its stored curve when it differs, logged as a
+    single "premium_curve" change, and bumps scraped_at like any other change.
+    Returns inserted/changed/unchanged counts.
+    """
+    # Last occurrence wins when a scraper returns the same plan twice
+    batch = {(p["plan_name"], p["provider"]): _normalize_plan(p) for p in plans}
+    curves = {
+        (p["plan_name"], p["provider"]): _normalize_curve(p["premium_curve"])
+        for p in plans if p.get("premium_curve") is not None
+    }
+    counts = {"inserted": 0, "changed": 0, "unchanged": 0}
+    if not batch:
+        return counts
+    existing = _existing_rows(list(batch), db)
+    stored_curves = _stored_curves([existing[k]["id"] for k in curves if k in existing], db)
+    now = datetime.utcnow()
+
+    new_rows = []
+    updates_by_fields: Dict[Tuple[str, ...], List[Dict]] = defaultdict(list)
+    curve_updates: Dict[int, Tuple[Tuple[int, float], ...]] = {}
+    change_log = []
+    for key, row in batch.items():
+        stored = existing.get(key)
+        if stored is None:
+            new_rows.append(row)
+            continue
+        fields = tuple(f for f in _DIFF_FIELDS if not _same_value(stored[f], row[f]))
+        old_curve = stored_curves.get(stored["id"], ())
+        curve = curves.get(key, old_curve)
+        if not fields and curve == old_curve:
+            counts["unchanged"] += 1
+            continue
+        counts["changed"] += 1
+        # A curve-only change still bumps scraped_at (the plan's Last-Modified)
+        updates_by_fields[fields].append(row)
+        change_log.extend(
+            {
+                "plan_id": stored["id"],
+                "field": f,
+                "old_value": None if stored[f] is None else str(stored[f]),
+                "new_value": None if row[f] is None else str(row[f]),
+                "source": row["source"],
+                "changed_at": now,
+            }
+            for f in fields
         )
-        if existing:
-            for k, v in p.items():
-                setattr(existing, k, v)
-            existing.scraped_at = datetime.utcnow()
-        else:
-            db.add(InsurancePlan(**p))
+        if curve != old_curve:
+            curve_updates[stored["id"]] = curve
+            change_log.append({
+                "plan_id": stored["id"],
+                "field": "premium_curve",
+                "old_value": _format_curve(old_curve) or None,
+                "new_value": _format_curve(curve) or None,
+                "source": row["source"],
+                "changed_at": now,
+            })
+
+    if new_rows:
+        db.execute(insert(InsurancePlan), new_rows)
+        new_curves = [(row["plan_name"], row["provider"]) for row in new_rows
+                      if curves.get((row["plan_name"], row["provider"]))]
+        if new_curves:
+            inserted = _existing_rows(new_curves, db)
+            curve_updates.update({inserted[key]["id"]: curves[key] for key in new_curves})
+    for fields, rows in updates_by_fields.items():
+        _bulk_update(rows, fields, db, now)
+    if curve_updates:
+        _replace_curves(curve_updates, db)
+    if change_log:
+        db.execute(insert(PlanChange), change_log)
     db.commit()
 
+    counts["inserted"] = len(new_rows)
+    return counts
 
-def run_scrape_job():
+
+def _source_timeout(name: str, default: float) -> float:
+    """Per-source timeout, overridable with e.g. SCRAPE_TIMEOUT_POLICYBAZAAR=90."""
+    return env_float(f"SCRAPE_TIMEOUT_{name.upper()}", default)
+
+
+def _timed_fetch(fetch: Callable[[], List[Dict]]) -> Tuple[List[Dict], float]:
+    """Run one scraper and return (plans, elapsed seconds)."""
+    started = time.perf_counter()
+    plans = fetch()
+    return plans or [], time.perf_counter() - started
+
+
+def _submit_alone(fetch: Callable[[], List[Dict]]) -> Future:
+    """Run one scraper on its own thread so sequential mode can stop waiting on it."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape")
+    try:
+        return executor.submit(_timed_fetch, fetch)
+    finally:
+        executor.shutdown(wait=False)
+
+
+def _apply_result(name: str, optional: bool, plans: List[Dict], db: Session) -> Dict[str, int]:
+    if plans:
+        counts = _upsert_plans(plans, db)
+        logger.info(
+            f"{name}: {len(plans)} plans — {counts['inserted']} new, "
+            f"{counts['changed']} changed, {counts['unchanged']} unchanged"
+        )
+        return counts
+    if not optional:
+        logger.info(f"{name}: no plans returned")
+    return {"inserted": 0, "changed": 0, "unchanged": 0}
+
+
+_job_lock = threading.Lock()
+_job_status: Dict = {
+    "running": False,
+    "runs_completed": 0,
+    "last_started_at": None,
+    "last_finished_at": None,
+    "last_fresh_data_at": None,     # last run in which at least one live source returned plans
+}
+
+
+def scrape_status() -> Dict:
+    """Snapshot of the scrape job's progress (used by /api/ready)."""
+    return dict(_job_status)
+
+
+def seed_if_empty(db: Optional[Session] = None) -> Optional[Dict[str, int]]:
+    """Load the seed plans into an empty DB. Fast and offline, so safe to call at startup."""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        if db.query(InsurancePlan).count() > 0:
+            return None
+        logger.info("DB empty — seeding with 29 fallback plans")
+        bump_catalog_version(db)            # committed together with the seed plans
+        return _upsert_plans(SEED_PLANS, db)
+    finally:
+        if own_session:
+            db.close()
+
+
+def run_scrape_job(concurrent: Optional[bool] = None) -> Dict:
+    """
+    Run the full scrape job unless one is already in progress (startup, the 12-hour
+    schedule and POST /api/scrape can otherwise overlap). See _run_scrape_job.
+    """
+    if not _job_lock.acquire(blocking=False):
+        logger.info("Scrape job already running — skipping this trigger")
+        return {"skipped": True}
+    _job_status.update(running=True, last_started_at=datetime.utcnow())
+    try:
+        report = _run_scrape_job(concurrent)
+        if any(s.get("plans") for name, s in report["sources"].items() if name != "Seed"):
+            _job_status["last_fresh_data_at"] = datetime.utcnow()
+        return report
+    finally:
+        _job_status.update(
+            running=False,
+            runs_completed=_job_status["runs_completed"] + 1,
+            last_finished_at=datetime.utcnow(),
+        )
+        _job_lock.release()
+
+
+def _run_scrape_job(concurrent: Optional[bool]) -> Dict:
     """
     Full scrape job — runs all sources, seeds if DB is empty.
     Order: seed (if empty) → PolicyX → Coverfox → CoverfoxCSR → MaxLife → HDFCLife → BankBazaar → PolicyBazaar → InsuranceDekho
+
+    In concurrent mode (default, SCRAPE_CONCURRENT=1) every source is fetched and
+    parsed on a bounded worker pool (SCRAPE_MAX_WORKERS) while results are still
+    applied to the DB one source at a time in the priority order above, so later
+    sources keep overriding earlier ones exactly as in sequential mode.
+    Each source gets SCRAPE_SOURCE_TIMEOUT seconds (or its SCRAPE_TIMEOUT_<NAME>
+    override) from when it was submitted, and the whole job is bounded by
+    SCRAPE_DEADLINE seconds. A source that finished in time is applied even if
+    an earlier one used up the deadline; sources still running are dropped for
+    this run. Sequential mode runs each source on its own thread so the same
+    timeouts apply.
+
+    Returns a report with wall-clock time, the sum of per-source times and
+    inserted/changed/unchanged row counts per source.
     """
+    if concurrent is None:
+        concurrent = os.getenv("SCRAPE_CONCURRENT", "1") != "0"
+    max_workers = max(1, env_int("SCRAPE_MAX_WORKERS", 4))
+    default_timeout = env_float("SCRAPE_SOURCE_TIMEOUT", 90)
+    deadline = env_float("SCRAPE_DEADLINE", 180)
+
+    report: Dict = {"mode": "concurrent" if concurrent else "sequential", "sources": {}}
+    job_started = time.perf_counter()
     db = SessionLocal()
+    executor = None
     try:
-        total = db.query(InsurancePlan).count()
-
         # Always ensure seed data is present
-        if total == 0:
-            logger.info("DB empty — seeding with 29 fallback plans")
-            _upsert_plans(SEED_PLANS, db)
-
-        # ── 1. PolicyX (primary — server-side HTML, reliable) ──────────
-        logger.info("Scraping PolicyX…")
-        try:
-            px_plans = scrape_policyx()
-            if px_plans:
-                _upsert_plans(px_plans, db)
-                logger.info(f"PolicyX: upserted {len(px_plans)} plans")
-            else:
-                logger.info("PolicyX: no plans returned")
-        except Exception as e:
-            logger.warning(f"PolicyX failed: {e}")
-
-        # ── 2. Coverfox (live CSR + plan details) ──────────────────────
-        logger.info("Scraping Coverfox…")
-        try:
-            cf_plans = scrape_coverfox()
-            if cf_plans:
-                _upsert_plans(cf_plans, db)
-                logger.info(f"Coverfox: upserted {len(cf_plans)} plans")
-            else:
-                logger.info("Coverfox: no plans returned")
-        except Exception as e:
-            logger.warning(f"Coverfox failed: {e}")
-
-        # ── 3. CoverfoxCSR (dedicated CSR ratio page) ──────────────────
-        logger.info("Scraping Coverfox CSR page…")
-        try:
-            csr_plans = scrape_coverfox_csr()
-            if csr_plans:
-                _upsert_plans(csr_plans, db)
-                logger.info(f"CoverfoxCSR: upserted {len(csr_plans)} plans")
-            else:
-                logger.info("CoverfoxCSR: no plans returned")
-        except Exception as e:
-            logger.warning(f"CoverfoxCSR failed: {e}")
-
-        # ── 4. MaxLife (Axis Max Life official site) ────────────────────
-        logger.info("Scraping MaxLife…")
-        try:
-            ml_plans = scrape_maxlife()
-            if ml_plans:
-                _upsert_plans(ml_plans, db)
-                logger.info(f"MaxLife: upserted {len(ml_plans)} plans")
-            else:
-                logger.info("MaxLife: no plans returned")
-        except Exception as e:
-            logger.warning(f"MaxLife failed: {e}")
-
-        # ── 5. HDFCLife (HDFC Life official site) ──────────────────────
-        logger.info("Scraping HDFCLife…")
-        try:
-            hdfc_plans = scrape_hdfclife()
-            if hdfc_plans:
-                _upsert_plans(hdfc_plans, db)
-                logger.info(f"HDFCLife: upserted {len(hdfc_plans)} plans")
-            else:
-                logger.info("HDFCLife: no plans returned")
-        except Exception as e:
-            logger.warning(f"HDFCLife failed: {e}")
-
-        # ── 6. BankBazaar (CSR comparison table) ───────────────────────
-        logger.info("Scraping BankBazaar…")
-        try:
-            bb_plans = scrape_bankbazaar()
-            if bb_plans:
-                _upsert_plans(bb_plans, db)
-                logger.info(f"BankBazaar: upserted {len(bb_plans)} plans")
-            else:
-                logger.info("BankBazaar: no plans returned")
-        except Exception as e:
-            logger.warning(f"BankBazaar failed: {e}")
-
-        # ── 7. PolicyBazaar (optional, may be blocked) ─────────────────
-        logger.info("Trying PolicyBazaar (optional)…")
-        try:
-            pb_plans = scrape_policybazaar()
-            if pb_plans:
-                _upsert_plans(pb_plans, db)
-                logger.info(f"PolicyBazaar: upserted {len(pb_plans)} plans")
-        except Exception as e:
-            logger.info(f"PolicyBazaar skipped: {e}")
-
-        # ── 8. InsuranceDekho (optional, may be blocked) ───────────────
-        logger.info("Trying InsuranceDekho (optional)…")
-        try:
-            id_plans = scrape_insurancedekho()
-            if id_plans:
-                _upsert_plans(id_plans, db)
-                logger.info(f"InsuranceDekho: upserted {len(id_plans)} plans")
-        except Exception as e:
-            logger.info(f"InsuranceDekho skipped: {e}")
+        seeded = seed_if_empty(db)
+        if seeded:
+            report["sources"]["Seed"] = {"plans": len(SEED_PLANS), "seconds": 0.0, **seeded}
+
+        futures, submitted = {}, {}
+        if concurrent:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+            for name, fetch, _, _ in SCRAPERS:
+                futures[name], submitted[name] = executor.submit(_timed_fetch, fetch), time.perf_counter()
+
+        for name, fetch, optional, source_default in SCRAPERS:
+            source_timeout = _source_timeout(name, source_default or default_timeout)
+            logger.info(f"{'Collecting' if concurrent else 'Scraping'} {name}…")
+            try:
+                if not concurrent:
+                    if time.perf_counter() - job_started >= deadline:
+                        raise FuturesTimeout()
+                    futures[name], submitted[name] = _submit_alone(fetch), time.perf_counter()
+                # Each source's timeout runs from its submission; a result that is already in counts
+                timeout = min(submitted[name] + source_timeout, job_started + deadline) - time.perf_counter()
+                plans, elapsed = futures[name].result(timeout=max(timeout, 0))
+                report["sources"][name] = {
+                    "plans": len(plans),
+                    "seconds": round(elapsed, 2),
+                    **_apply_result(name, optional, plans, db),
+                }
+            except FuturesTimeout:
+                report["sources"][name] = {"plans": 0, "seconds": None, "error": "timeout"}
+                logger.warning(f"{name} timed out ({source_timeout:.0f}s source timeout, {deadline:.0f}s job deadline)")
+            except Exception as e:
+                report["sources"][name] = {"plans": 0, "seconds": None, "error": str(e)}
+                if optional:
+                    logger.info(f"{name} skipped: {e}")
+                else:
+                    logger.warning(f"{name} failed: {e}")
 
         final_count = db.query(InsurancePlan).count()
         logger.info(f"Scrape complete. Total plans in DB: {final_count}")
@@ -159,22 +414,51 @@ def run_scrape_job():
     except Exception as e:
         logger.error(f"Scrape job error: {e}")
     finally:
+        if executor:
+            # Don't wait for stragglers that blew their timeout; their results are dropped.
+            executor.shutdown(wait=False, cancel_futures=True)
         db.close()
 
+    # Publish the new plan set only once every source has been applied: the version
+    # bump is what makes the other worker processes reload it
+    try:
+        if any(s.get("inserted") or s.get("changed") for s in report["sources"].values()):
+            with SessionLocal() as db:
+                bump_catalog_version(db)
+                db.commit()
+        refresh_snapshot()
+    except Exception as e:
+        logger.error(f"Plan snapshot refresh failed: {e}")
+
+    wall = time.perf_counter() - job_started
+    source_sum = sum(s["seconds"] or 0 for s in report["sources"].values())
+    report["wall_seconds"] = round(wall, 2)
+    report["source_seconds_sum"] = round(source_sum, 2)
+    logger.info(
+        f"Scrape job ({report['mode']}) took {wall:.1f}s wall-clock "
+        f"vs {source_sum:.1f}s summed across sources"
+    )
+    return report
+
 
-def start_scheduler():
-    """Start APScheduler that runs scrape every 12 hours."""
+def start_scheduler(run_now: bool = False):
+    """
+    Start APScheduler that runs scrape every 12 hours.
+    With run_now, the first run starts immediately on the scheduler's worker thread.
+    """
     from apscheduler.schedulers.background import BackgroundScheduler
 
     scheduler = BackgroundScheduler()
+    extra = {"next_run_time": datetime.now()} if run_now else {}
     scheduler.add_job(
         run_scrape_job,
         trigger="interval",
         hours=12,
         id="scrape_job",
         replace_existing=True,
+        **extra,
     )
     scheduler.start()
-    logger.info("Scheduler started — scrape runs every 12 hours")
+    logger.info("Scheduler started — scrape runs every 12 hours" + (" (first run now)" if run_now else ""))
     return scheduler
 
@@ -0,0 +1,26 @@
+"""
+Numeric settings read from the environment (and backend/.env).
+
+A malformed value is logged and replaced by the default instead of raising,
+so a typo in .env degrades one setting rather than stopping the app at import.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={os.getenv(name)!r}")
+        return default
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(env_float(name, default))
+    except (ValueError, OverflowError):     # nan / inf
+        logger.warning(f"Ignoring invalid {name}={os.getenv(name)!r}")
+        return default
@@ -9,6 +9,26 @@ const QUICK_QUESTIONS = [
   'How to reduce my premium?',
 ]
 
+// Parse a text/event-stream body into { event, data } objects as chunks arrive
+async function* readEvents(res) {
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) return
+    buffer += decoder.decode(value, { stream: true })
+    let end
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, end)
+      buffer = buffer.slice(end + 2)
+      const event = block.match(/^event: (.*)$/m)?.[1]
+      const data = block.match(/^data: (.*)$/m)?.[1]
+      if (event && data) yield { event, data: JSON.parse(data) }
+    }
+  }
+}
+
 export default function ChatPanel({ userProfile, topPlans, onClose }) {
   const [messages, setMessages] = useState([
     {
@@ -19,19 +39,28 @@ export default function ChatPanel({ userProfile, topPlans, onClose }) {
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
   const bottomRef = useRef(null)
+  const abortRef = useRef(null)
 
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' })
   }, [messages])
 
+  // Closing the panel mid-answer disconnects, which stops the generation server-side
+  useEffect(() => () => abortRef.current?.abort(), [])
+
+  const setReply = (update) =>
+    setMessages((prev) => [...prev.slice(0, -1), { role: 'assistant', text: update(prev[prev.length - 1].text) }])
+
   const send = async (text) => {
     const msg = (text || input).trim()
     if (!msg || loading) return
     setInput('')
-    setMessages((prev) => [...prev, { role: 'user', text: msg }])
+    setMessages((prev) => [...prev, { role: 'user', text: msg }, { role: 'assistant', text: '' }])
     setLoading(true)
+    const controller = new AbortController()
+    abortRef.current = controller
     try {
-      const res = await fetch(`${API_BASE}/api/chat`, {
+      const res = await fetch(`${API_BASE}/api/chat/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -39,19 +68,24 @@ export default function ChatPanel({ userProfile, topPlans, onClose }) {
           user_profile: userProfile,
           top_plans: topPlans,
         }),
+        signal: controller.signal,
       })
-      const data = await res.json()
-      setMessages((prev) => [...prev, { role: 'assistant', text: data.reply }])
-    } catch {
-      setMessages((prev) => [
-        ...prev,
-        { role: 'assistant', text: 'Sorry, I encountered an error. Please try again.' },
-      ])
+      if (!res.ok) throw new Error(`HTTP ${res.status}`)
+      for await (const { event, data } of readEvents(res)) {
+        if (event === 'token') setReply((text) => text + data.text)
+        else if (event === 'done') setReply(() => data.reply)
+        else if (event === 'error') setReply(() => data.detail)
+      }
+    } catch (err) {
+      if (err.name === 'AbortError') return
+      setReply(() => 'Sorry, I encountered an error. Please try again.')
     } finally {
       setLoading(false)
     }
   }
 
+  const waiting = loading && !messages[messages.length - 1].text
+
   return (
     <div
       className="fixed bottom-6 right-6 z-50 w-80 bg-white rounded-2xl shadow-2xl border border-gray-200 flex flex-col animate-fadeIn"
@@ -78,7 +112,7 @@ export default function ChatPanel({ userProfile, topPlans, onClose }) {
 
       {/* Messages */}
       <div className="flex-1 overflow-y-auto p-3 space-y-3">
-        {messages.map((m, i) => (
+        {messages.filter((m) => m.text).map((m, i) => (
           <div key={i} className={`flex ${m.role === 'user' ? 'justify-end' : 'justify-start'}`}>
             <div
               className={`max-w-[86%] rounded-2xl px-3.5 py-2 text-sm leading-relaxed ${
@@ -91,7 +125,7 @@ export default function ChatPanel({ userProfile, topPlans, onClose }) {
             </div>
           </div>
         ))}
-        {loading && (
+        {waiting && (
           <div className="flex justify-start">
             <div className="bg-gray-100 rounded-2xl rounded-bl-sm px-4 py-3">
               <span className="flex gap-1.5 items-center">
@@ -16,7 +16,7 @@ export default function CompareModal({ plans, userProfile, onClose }) {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({
-            plan_names: plans.map((p) => p.plan_name),
+            plan_names: plans.map((p) => `${p.plan_name} (${p.provider})`),
             user_profile: userProfile,
           }),
         })
@@ -96,9 +96,10 @@ export default function CompareModal({ plans, userProfile, onClose }) {
                       <thead className="bg-gray-50 text-gray-500 text-xs uppercase tracking-wide">
                         <tr>
                           <th className="px-4 py-3 text-left min-w-[120px]">Aspect</th>
-                          {plans.map((p) => (
-                            <th key={p.plan_name} className="px-4 py-3 text-center">
-                              {p.plan_name}
+                          {result.plans.map((p) => (
+                            <th key={p.id} className="px-4 py-3 text-center">
+                              <div>{p.plan_name}</div>
+                              <div className="normal-case font-normal text-gray-400">{p.provider}</div>
                             </th>
                           ))}
                         </tr>
@@ -112,35 +113,17 @@ export default function CompareModal({ plans, userProfile, onClose }) {
                                 <div className="text-xs text-gray-400 mt-0.5">{row.why}</div>
                               )}
                             </td>
-                            {plans.map((p) => (
+                            {result.plans.map((p) => (
                               <td
-                                key={p.plan_name}
+                                key={p.id}
                                 className={`px-4 py-3 text-center ${
-                                  row.winner_plan === p.plan_name
+                                  row.winner_plan === p.id
                                     ? 'font-bold text-green-700 bg-green-50'
                                     : 'text-gray-600'
                                 }`}
                               >
-                                {(() => {
-                                  if (row.values?.[p.plan_name]) return row.values[p.plan_name]
-                                  const lower = p.plan_name.toLowerCase()
-                                  const ci = Object.entries(row.values || {}).find(
-                                    ([k]) => k.toLowerCase() === lower
-                                  )
-                                  if (ci) return ci[1]
-                                  const words = new Set(p.plan_name.toLowerCase().split(' '))
-                                  const best = Object.entries(row.values || {}).reduce(
-                                    (acc, [k, v]) => {
-                                      const kw = new Set(k.toLowerCase().split(' '))
-                                      const overlap = [...words].filter(w => kw.has(w)).length /
-                                        Math.max(new Set([...words, ...kw]).size, 1)
-                                      return overlap > acc.score ? { score: overlap, val: v } : acc
-                                    },
-                                    { score: 0, val: null }
-                                  )
-                                  return best.score > 0.25 ? best.val : '—'
-                                })()}
-                                {row.winner_plan === p.plan_name && (
+                                {row.values?.[p.id] ?? '—'}
+                                {row.winner_plan === p.id && (
                                   <span className="ml-1 text-green-500">✓</span>
                                 )}
                               </td>
@@ -165,15 +148,17 @@ export default function CompareModal({ plans, userProfile, onClose }) {
                     {result.detailed_comparison.map((plan, i) => (
                       <div key={i} className="border border-gray-200 rounded-xl p-5 bg-gray-50">
                         <div className="flex items-center gap-2 mb-3">
-                          {result.winner === plan.plan_name && (
+                          {result.winner_id === plan.plan_id && (
                             <span className="text-xl">🏆</span>
                           )}
                           <h4 className="font-bold text-gray-800">{plan.plan_name}</h4>
                         </div>
-                        <p className="text-xs text-gray-500 mb-3">
-                          Best for:{' '}
-                          <span className="text-blue-600 font-semibold">{plan.best_for}</span>
-                        </p>
+                        {plan.best_for && (
+                          <p className="text-xs text-gray-500 mb-3">
+                            Best for:{' '}
+                            <span className="text-blue-600 font-semibold">{plan.best_for}</span>
+                          </p>
+                        )}
                         <div className="grid grid-cols-2 gap-3">
                           <div>
                             <p className="text-xs font-bold text-green-700 mb-1">✅ Strengths</p>